@@ -1,13 +1,17 @@
 import os
 import json
+import time
 import argparse
 from loguru import logger
-from src.generator.openai_chat import OpenAIChat
-from src.generator.huggingface_instruct import HuggingfaceInstruct
-from src.generator.huggingface_complete import HuggingfaceComplete
-from src.generator.huggingface_api import HuggingfaceAPIInferenceGenerator
+from src.generator.registry import generator_class, methods, ALIASES
+from src.generator.response_cache import ResponseCache
 from src.utils import models
 
+STARTED = time.monotonic()
+# Seconds a chat API run may take from launch to its first request; it only needs the
+# SDK of one provider, so going over means a heavy library is imported eagerly again
+API_STARTUP_BUDGET = 1.0
+
 def setup_logger():
     """Configure logger settings"""
     # Make sure logs directory exists
@@ -43,9 +47,9 @@ def parse_arguments():
     parser.add_argument(
         "--method", 
         type=str, 
-        default="openai",
-        choices=["openai", "hf-instruct", "hf-complete", "hf-api"],
-        help="Method for code generation"
+        default="chat-api",
+        choices=methods(),
+        help="Method for code generation (\"openai\" is an alias of chat-api)"
     )
     parser.add_argument(
         "--samples", 
@@ -53,6 +57,98 @@ def parse_arguments():
         default=1,
         help="Number of samples per task"
     )
+    parser.add_argument(
+        "--concurrency", 
+        type=int, 
+        default=8,
+        help="Chat API requests in flight at once per provider"
+    )
+    parser.add_argument(
+        "--rpm", 
+        type=int, 
+        default=0,
+        help="Chat API requests per minute per provider (0 for no limit)"
+    )
+    parser.add_argument(
+        "--tpm", 
+        type=int, 
+        default=0,
+        help="Chat API tokens per minute per provider (0 for no limit)"
+    )
+    parser.add_argument(
+        "--batch", 
+        action="store_true",
+        help="Send all chat API requests as one job of the provider's batch API (GPT and Claude)"
+    )
+    parser.add_argument(
+        "--batch-poll-interval", 
+        type=float, 
+        default=30,
+        help="Seconds between two status checks of a batch job"
+    )
+    parser.add_argument(
+        "--batch-tokens", 
+        type=int, 
+        default=32768,
+        help="Token budget (prompt plus generated) of one batched generate() call for local HF models"
+    )
+    parser.add_argument(
+        "--max-new-tokens", 
+        type=int, 
+        default=None,
+        help="Cap on the tokens generated per sample by local HF models (generation also stops at the end of the program)"
+    )
+    parser.add_argument(
+        "--device", 
+        type=str, 
+        default="auto",
+        choices=["auto", "cpu"],
+        help="Where local HF models run: \"auto\" places them with device_map, \"cpu\" uses the CPU engine"
+    )
+    parser.add_argument(
+        "--int8", 
+        action="store_true",
+        help="Quantize Linear layers of local HF models to int8 (with --device cpu)"
+    )
+    parser.add_argument(
+        "--threads", 
+        type=int, 
+        default=0,
+        help="torch intra-op threads for --device cpu (0 for the torch default)"
+    )
+    parser.add_argument(
+        "--interop-threads", 
+        type=int, 
+        default=0,
+        help="torch inter-op threads for --device cpu (0 for the torch default)"
+    )
+    parser.add_argument(
+        "--torch-compile", 
+        action="store_true",
+        help="Compile local HF models with torch.compile (with --device cpu)"
+    )
+    parser.add_argument(
+        "--response-cache", 
+        type=str, 
+        default=None,
+        help="Directory of the on-disk cache of model responses (disabled if not set)"
+    )
+    parser.add_argument(
+        "--response-cache-size", 
+        type=int, 
+        default=1024,
+        help="Maximum size of the response cache in MB"
+    )
+    parser.add_argument(
+        "--replay", 
+        action="store_true",
+        help="Only use responses from the response cache and fail on a miss"
+    )
+    parser.add_argument(
+        "--resume", 
+        action="store_true",
+        help="Keep the samples already in the sample log and only generate the missing ones"
+    )
     parser.add_argument(
         "--generation-only", 
         action="store_true",
@@ -81,20 +177,41 @@ def main():
         logger.info(f"Starting code generation with {args.model} model in {args.mode} mode")
         
         # Choose the model type for code generation
-        method = args.method
+        method = ALIASES.get(args.method, args.method)
         mode = args.mode
+        if args.replay and not args.response_cache:
+            logger.error("--replay needs --response-cache")
+            return
+        cache = ResponseCache(args.response_cache, args.response_cache_size, replay=args.replay) if args.response_cache else None
         
+        # Only the selected backend and its libraries are imported
+        generator = generator_class(method)
         if method == "chat-api":
-            runner = OpenAIChat(model, mode)
-        elif method == "hf-instruct":
-            runner = HuggingfaceInstruct(model, mode)
-        elif args.method == "hf-complete":
-            runner = HuggingfaceComplete(model, mode)
-        elif method == "hf-api":
-            runner = HuggingfaceAPIInferenceGenerator(model, args.mode)
+            options = models.GenerationOptions(
+                concurrency=args.concurrency,
+                requests_per_minute=args.rpm,
+                tokens_per_minute=args.tpm,
+                batch=args.batch,
+                batch_poll_interval=args.batch_poll_interval
+            )
+            runner = generator(model, mode, options, cache, resume=args.resume)
+        elif method in ("hf-instruct", "hf-complete"):
+            cpu = None
+            if args.device == "cpu":
+                cpu = models.CPUInferenceOptions(
+                    quantize=args.int8,
+                    threads=args.threads,
+                    interop_threads=args.interop_threads,
+                    compile=args.torch_compile
+                )
+            runner = generator(model, mode, cache, batch_tokens=args.batch_tokens,
+                               max_new_tokens=args.max_new_tokens, resume=args.resume, cpu=cpu)
         else:
-            logger.error(f"Unknown method: {method}")
-            return
+            runner = generator(model, mode, cache, resume=args.resume)
+        startup = time.monotonic() - STARTED
+        logger.info(f"Startup took {startup:.2f}s")
+        if method == "chat-api" and startup > API_STARTUP_BUDGET:
+            logger.warning(f"Startup exceeded the {API_STARTUP_BUDGET}s budget of a chat API run")
         # Run code generation
         success = runner.eval()
         
@@ -0,0 +1,2 @@
+# This file initializes the data package.
+from .task_store import Task, TaskStore, task_set_path
@@ -0,0 +1,144 @@
+import os
+import json
+import threading
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TASK_SET_FILES = {
+    "instruct": "Instruction_Set.json",
+    "complete": "Completion_Set.json",
+}
+
+
+def task_set_path(mode):
+    """
+    Return the path of the benchmark JSON file for a generation mode.
+    Args:
+        mode (str): "Instruct" or "Complete" (case-insensitive).
+    Returns:
+        str: Absolute path of the Instruction_Set.json or Completion_Set.json file.
+    """
+    return os.path.join(DATA_DIR, TASK_SET_FILES[mode.lower()])
+
+
+def _file_names(value):
+    """Normalize a file name field (list, comma-separated string or empty) to a list."""
+    if isinstance(value, list):
+        return [name for name in value if name]
+    if isinstance(value, str) and value:
+        return [name.strip() for name in value.split(",") if name.strip()]
+    return []
+
+
+def _decode(value):
+    """Decode an inputs/outputs payload, which the Hugging Face export stores as a JSON string."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value else {}
+        except json.JSONDecodeError:
+            value = {}
+    return value or {}
+
+
+class Task:
+    """
+    A single benchmark task.
+    The input and output payloads are only decoded the first time they are accessed.
+    """
+
+    def __init__(self, record):
+        self._record = record
+        self._inputs = None
+        self._outputs = None
+
+    @property
+    def program_name(self):
+        return self._record["Program_name"]
+
+    @property
+    def prompt(self):
+        return self._record.get("Cobol_Eval", "")
+
+    @property
+    def expected_program(self):
+        return self._record.get("Expected_Program", "")
+
+    @property
+    def input_file_names(self):
+        # Completion sets written by data_processor use 'input_files' instead
+        return _file_names(self._record.get("input_file_names", self._record.get("input_files")))
+
+    @property
+    def output_file_names(self):
+        return _file_names(self._record.get("output_file_names", self._record.get("output_files")))
+
+    @property
+    def inputs(self):
+        if self._inputs is None:
+            self._inputs = _decode(self._record.get("inputs"))
+        return self._inputs
+
+    @property
+    def outputs(self):
+        if self._outputs is None:
+            self._outputs = _decode(self._record.get("outputs"))
+        return self._outputs
+
+    def to_dict(self):
+        """Return the raw benchmark record."""
+        return self._record
+
+
+class TaskStore:
+    """
+    Benchmark tasks indexed by program name.
+
+    Stores are shared per file: `TaskStore.load` parses each JSON file once per
+    process and hands the same instance to every evaluator and worker thread.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        with open(self.path, "r") as f:
+            records = json.load(f)
+        self._tasks = {record["Program_name"]: Task(record) for record in records}
+
+    @classmethod
+    def load(cls, path):
+        """
+        Return the shared store for a benchmark file, parsing it if it changed on disk.
+        Args:
+            path (str): Path of the Instruction_Set.json or Completion_Set.json file.
+        Returns:
+            TaskStore: The indexed tasks.
+        """
+        path = os.path.abspath(path)
+        key = (path, os.path.getmtime(path))
+        with cls._shared_lock:
+            store = cls._shared.get(key)
+            if store is None:
+                store = cls(path)
+                cls._shared = {k: v for k, v in cls._shared.items() if k[0] != path}
+                cls._shared[key] = store
+        return store
+
+    @classmethod
+    def for_mode(cls, mode):
+        """Return the shared store for the benchmark file of a generation mode."""
+        return cls.load(task_set_path(mode))
+
+    def get(self, program_name):
+        """Return the task for a program name, or None if it is not in the benchmark."""
+        return self._tasks.get(program_name)
+
+    def __contains__(self, program_name):
+        return program_name in self._tasks
+
+    def __iter__(self):
+        return iter(self._tasks.values())
+
+    def __len__(self):
+        return len(self._tasks)
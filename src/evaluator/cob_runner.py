@@ -0,0 +1,110 @@
+"""
+Long-lived runner that executes COBOL programs built as loadable modules (`cobc -m`).
+
+The runner initializes libcob once and then serves jobs read as JSON lines from
+the request pipe. Every job runs in a child forked from the initialized runner:
+the child redirects stdout/stderr to the job's files, changes into the job's
+directory, loads the module and calls its entry point. STOP RUN, a crash or a
+resource limit therefore only ends that child, never the runner, and no state of
+one program (loaded modules, open files, libcob globals) reaches the next. The
+runner writes a JSON reply with the child's return code and resource usage.
+
+This script only uses the standard library so that (re)starting it stays cheap.
+
+Usage: python cob_runner.py <request_fd> <reply_fd>
+"""
+import os
+import sys
+import json
+import time
+import signal
+import ctypes
+import resource
+import ctypes.util
+
+
+def _open_output(path):
+    return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+
+def _resolve(module, entries):
+    for name in entries:
+        try:
+            return getattr(module, name)
+        except AttributeError:
+            continue
+    raise AttributeError(f"none of the entry points {entries} found")
+
+
+def run_child(job, libc, pipe_fds):
+    """
+    Run one module in the forked child and exit with its return code; never returns.
+    Args:
+        job (dict): 'module', 'entries', 'cwd', 'stdout', 'stderr' and 'cpu_time'.
+        libc: The C library, used to flush stdio before exiting.
+        pipe_fds (tuple): The runner's request and reply pipes, closed in the child.
+    """
+    returncode = 127
+    try:
+        for fd in pipe_fds:
+            os.close(fd)
+        # Python starts with SIGPIPE and SIGXFSZ ignored; programs expect the defaults, so
+        # writing past RLIMIT_FSIZE raises SIGXFSZ ("output_limit") instead of EFBIG
+        for signum in (signal.SIGPIPE, signal.SIGXFSZ):
+            signal.signal(signum, signal.SIG_DFL)
+        os.dup2(_open_output(job["stdout"]), 1)
+        os.dup2(_open_output(job["stderr"]), 2)
+        os.chdir(job["cwd"])
+        cpu_time = job.get("cpu_time")
+        if cpu_time:
+            # A forked child starts with no CPU time used; the hard limit kills it a second later
+            resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_time), int(cpu_time) + 1))
+        handle = ctypes.CDLL(job["module"], mode=ctypes.RTLD_LOCAL)
+        entry = _resolve(handle, job["entries"])
+        entry.restype = ctypes.c_int
+        # STOP RUN exits right here with the program's return code
+        returncode = entry()
+    except Exception as e:
+        os.write(2, f"cob_runner: {e}\n".encode())
+    finally:
+        libc.fflush(None)
+        os._exit(returncode & 0xFF)
+
+
+def run_job(job, libc, pipe_fds):
+    """
+    Run one module in a child process and wait for it.
+    Returns:
+        dict: The reply: 'returncode' (negative for a signal), 'duration', 'cpu_time'
+        and 'peak_rss_kb' of the child.
+    """
+    start = time.monotonic()
+    libc.fflush(None)
+    pid = os.fork()
+    if pid == 0:
+        run_child(job, libc, pipe_fds)
+    _, wait_status, usage = os.wait4(pid, 0)
+    return {
+        "returncode": os.waitstatus_to_exitcode(wait_status),
+        "duration": time.monotonic() - start,
+        "cpu_time": usage.ru_utime + usage.ru_stime,
+        "peak_rss_kb": usage.ru_maxrss
+    }
+
+
+def main():
+    request_fd, reply_fd = int(sys.argv[1]), int(sys.argv[2])
+    libc = ctypes.CDLL(None)
+    libcob = ctypes.CDLL(ctypes.util.find_library("cob") or "libcob.so", mode=ctypes.RTLD_GLOBAL)
+    libcob.cob_init(0, None)
+
+    with os.fdopen(request_fd, "r") as requests, os.fdopen(reply_fd, "w", buffering=1) as replies:
+        for line in requests:
+            reply = run_job(json.loads(line), libc, (request_fd, reply_fd))
+            replies.write(json.dumps(reply) + "\n")
+
+    libcob.cob_tidy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import re
+from loguru import logger
+from src.utils.cobol_preflight import INDICATORS
+from src.utils.edit_distance import lcs_length
+
+# COBOL lexemes: string literals, numbers, words (names, keywords, level numbers) and operators
+TOKEN = re.compile(r"""
+    "(?:[^"]|"")*"?            # string literal, "" escapes a quote
+  | '(?:[^']|'')*'?
+  | [+-]?\d*\.?\d+(?![\w-])    # numeric literal
+  | [A-Za-z0-9][A-Za-z0-9_-]*  # word
+  | \*\*|>=|<=|<>              # multi-character operators
+  | [^\s\w]                    # any other symbol, e.g. . , ( ) = + - * / < > :
+""", re.VERBOSE)
+
+
+def normalize_program(source):
+    """
+    Keep the code of a COBOL program, without its layout.
+    Fixed-format lines lose the sequence area (columns 1-6), the indicator area and
+    the identification area (columns 73+); comment lines and floating `*>` comments
+    are dropped. Lines not in fixed format, common in generated code, are kept whole.
+    Args:
+        source (str): The program text.
+    Returns:
+        list: The code lines, stripped.
+    """
+    lines = []
+    for line in source.expandtabs(8).splitlines():
+        if len(line) > 6 and (not line[:6].strip() or line[:6].isdigit()) and line[6] in INDICATORS:
+            if line[6] in "*/":
+                continue
+            line = line[7:72]
+        comment = line.find("*>")
+        if comment != -1 and line.count('"', 0, comment) % 2 == 0 and line.count("'", 0, comment) % 2 == 0:
+            line = line[:comment]
+        line = line.strip()
+        if line and not line.startswith("*"):
+            lines.append(line)
+    return lines
+
+
+def tokenize(source):
+    """
+    Split a COBOL program into lexemes. Words are upper-cased since COBOL is case
+    insensitive outside string literals.
+    """
+    tokens = []
+    for line in normalize_program(source):
+        for token in TOKEN.findall(line):
+            tokens.append(token if token[0] in "\"'" else token.upper())
+    return tokens
+
+
+def token_similarity(a, b):
+    """
+    Similarity of two token lists: 1 - D / (len(a) + len(b)) for the token-level
+    insert/delete distance D, the ratio Levenshtein.ratio reports. D is derived from
+    the longest common subsequence, computed bit-parallel in near-linear time.
+    """
+    if a == b:
+        return 1.0
+    return 2.0 * lcs_length(a, b) / (len(a) + len(b))
+
+
+def code_similarity(program, expected_program):
+    """
+    Token-level similarity between a generated and an expected COBOL program.
+    Returns:
+        float: A similarity between 0.0 and 1.0.
+    """
+    return token_similarity(tokenize(program), tokenize(expected_program))
+
+
+def similarity_scores(programs, expected_programs):
+    """
+    Score many generated programs against their expected programs.
+    Every distinct program is tokenized once and every distinct pair scored once,
+    which matters since all samples of a task share the expected program and
+    greedy samples are often identical.
+    Args:
+        programs (list): The generated programs.
+        expected_programs (list): The expected program of every generated program, None
+            where it is unknown.
+    Returns:
+        list: The similarity of every pair, rounded to 2 decimals; 0.0 without an expected program.
+    """
+    tokens = {}
+    scores = {}
+    results = []
+    for program, expected_program in zip(programs, expected_programs):
+        if expected_program is None:
+            results.append(0.0)
+            continue
+        pair = (program, expected_program)
+        if pair not in scores:
+            for source in pair:
+                if source not in tokens:
+                    tokens[source] = tokenize(source)
+            scores[pair] = round(token_similarity(tokens[program], tokens[expected_program]), 2)
+        results.append(scores[pair])
+    logger.info(f"Scored code similarity of {len(results)} programs ({len(scores)} distinct pairs)")
+    return results
@@ -0,0 +1,123 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from loguru import logger
+from src.utils.command_utils import launch
+from src.utils.disk_cache import DiskCache
+
+
+class CompileCache(DiskCache):
+    """
+    Content-addressed on-disk cache of cobc build results.
+
+    Entries are keyed on a hash of the normalized program source, the cobc version
+    and the compile flags. A successful build stores the produced artifact, a failed
+    build stores its return code and diagnostics, so neither has to be compiled again.
+    Every entry is a folder; the cache is bounded by size and evicts least recently
+    used entries first (see DiskCache).
+    """
+
+    META_FILE = "meta.json"
+    ARTIFACT_FILE = "artifact"
+    DESCRIPTION = "compile cache"
+
+    def __init__(self, cache_dir, max_size_mb=1024):
+        super().__init__(cache_dir, max_size_mb)
+        self._cobc_version = None
+        logger.info(f"Compile cache at {self.cache_dir} ({self.size() / (1024 * 1024):.1f} MB used)")
+
+    @staticmethod
+    def normalize(source):
+        """
+        Normalize program source so that cosmetic differences share a cache entry.
+        Line endings are unified and trailing whitespace and blank lines are dropped.
+        """
+        lines = source.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+    def cobc_version(self):
+        """Return the first line of `cobc --version`, queried once per cache."""
+        if self._cobc_version is None:
+            try:
+                result = launch(["cobc", "--version"])
+                self._cobc_version = result.stdout.splitlines()[0].strip() if result.stdout else "unknown"
+            except (OSError, IndexError):
+                self._cobc_version = "unknown"
+        return self._cobc_version
+
+    def key(self, source, flags):
+        """
+        Compute the cache key for a program.
+        Args:
+            source (str): The COBOL program source.
+            flags (list): The cobc flags the program is compiled with (excluding paths).
+        Returns:
+            str: The hex digest identifying the build.
+        """
+        payload = json.dumps([self.normalize(source), self.cobc_version(), list(flags)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, key):
+        """
+        Look up a cached build.
+        Args:
+            key (str): The cache key from `key()`.
+        Returns:
+            dict: The entry metadata ('returncode', 'stderr' and 'artifact' path when the
+            build succeeded), or None on a miss.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(os.path.join(path, self.META_FILE), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.count(hit=False)
+            return None
+
+        artifact = os.path.join(path, self.ARTIFACT_FILE)
+        if entry["returncode"] == 0:
+            if not os.path.exists(artifact):
+                self.count(hit=False)
+                return None
+            entry["artifact"] = artifact
+        self.touch(path)
+        self.count(hit=True)
+        return entry
+
+    def restore(self, entry, destination):
+        """Copy a cached artifact to `destination`, keeping its permissions."""
+        shutil.copy2(entry["artifact"], destination)
+
+    def store(self, key, returncode, stderr="", artifact_path=None):
+        """
+        Store the outcome of a build.
+        Args:
+            key (str): The cache key from `key()`.
+            returncode (int): The cobc return code.
+            stderr (str): The cobc diagnostics.
+            artifact_path (str): Path of the produced executable or module, if any.
+        """
+        path = self.entry_path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Build the entry in a scratch directory and rename it into place so that
+        # concurrent workers and interrupted runs never see a half-written entry.
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.cache_dir)
+        try:
+            with open(os.path.join(staging, self.META_FILE), "w") as f:
+                json.dump({"returncode": returncode, "stderr": stderr or ""}, f)
+            if returncode == 0 and artifact_path:
+                shutil.copy2(artifact_path, os.path.join(staging, self.ARTIFACT_FILE))
+            size = self.entry_size(staging)
+            os.rename(staging, path)
+        except OSError as e:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.exists(path):
+                logger.warning(f"Could not store compile cache entry {key}: {e}")
+            return
+
+        self.added(size)
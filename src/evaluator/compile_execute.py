@@ -1,18 +1,68 @@
 from src.utils import models
+from src.utils.command_utils import launch
+from src.utils.checkpoint import CheckpointLog
+from src.utils.cobol_preflight import preflight_programs
+from src.utils.result_store import ResultStore
+from .compile_cache import CompileCache
+from .workspace import Workspace
+from .output_compare import OutputComparator
+from .module_runner import ModuleRunner, entry_points
+from .code_similarity import code_similarity, similarity_scores
+from src.data import TaskStore
 import os
 import sys
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from loguru import logger
-import json
-from fuzzywuzzy import fuzz
-import difflib
 
 
 class CompileExecute:
-    def __init__(self, model: models.Model, csv_path, mode="instruct"):
+    # Columns of the generation CSV copied to the final results when present
+    INPUT_COLUMNS = ('Program_name', 'sample_id', 'Cobol_Eval', 'Generated_program', 'Expected_Program',
+                     'Expected_program', 'Bert_score')
+    # Column holding the reference program: generation CSVs and the result store use
+    # 'Expected_Program', BERT evaluation results 'Expected_program'
+    EXPECTED_COLUMNS = ('Expected_Program', 'Expected_program')
+    RESULT_COLUMNS = ('Code Similarity Score', 'Preflight', 'Compiled', 'Executed', 'Exec_status', 'Result_match')
+    # Result of a program that was never evaluated
+    EMPTY_RESULT = {
+        'Code Similarity Score': 0.0,
+        'Preflight': 'not_run',
+        'Compiled': 0,
+        'Executed': 0,
+        'Exec_status': 'not_run',
+        'Result_match': 0.0
+    }
+
+    def __init__(self, model: models.Model, csv_path, mode="instruct", workers=1,
+                 cache_dir=None, cache_size_mb=1024, limits: models.ExecutionLimits = None,
+                 ephemeral=False, scratch_root=None, keep=(), task_store: TaskStore = None,
+                 resume=False, max_compare_cost=2000, exec_mode="executable", preflight=True,
+                 store: ResultStore = None):
         self.model = model.name
         self.csv_path = csv_path
         self.mode = mode.lower()  # "instruct" or "complete"
+        self.workers = max(1, int(workers or 1))
+        # Time, memory and output caps for every executed program
+        self.limits = limits or models.ExecutionLimits()
+        # Ephemeral mode builds each program in a throwaway workspace (tmpfs when
+        # available) and only copies the artifact kinds listed in `keep` to output_path
+        self.ephemeral = ephemeral
+        self.scratch_root = scratch_root
+        self.keep = tuple(keep or ())
+        # "executable" builds standalone programs with cobc -x and starts each one as a
+        # new process, "module" builds cobc -m modules run by a persistent libcob runner
+        self.exec_mode = exec_mode
+        self.compile_flags = ['-m'] if exec_mode == "module" else ['-x']
+        self._runners = threading.local()
+        self._all_runners = []
+        self.comparator = OutputComparator(max_cost=max_compare_cost)
+        # Programs that cobc is certain to reject are caught in Python and never compiled
+        self.preflight = preflight
+        # Optional content-addressed cache of cobc builds shared across runs
+        self.compile_cache = CompileCache(cache_dir, cache_size_mb) if cache_dir else None
         self.current_dir = os.path.dirname(os.path.abspath(__file__))
         
         # Structure output path based on mode
@@ -21,24 +71,34 @@ class CompileExecute:
         else:
             self.output_path = f"{self.current_dir}/preds/{model.name}/complete"
         
-        os.makedirs(self.output_path, exist_ok=True)
+        if not self.ephemeral or self.keep:
+            os.makedirs(self.output_path, exist_ok=True)
+
+        # Results live next to the evaluator package, under src/final_results
+        self.results_dir = os.path.join(os.path.dirname(self.current_dir), "final_results", self.mode)
+        # Every finished program is appended to the checkpoint so an interrupted
+        # run can be resumed without evaluating it again
+        self.resume = resume
+        self.checkpoint = CheckpointLog(os.path.join(self.results_dir, f"{model.name}_{self.mode}_checkpoint.jsonl"))
     
         try:
-            # Load appropriate JSON file based on mode
-            if self.mode == "instruct":
-                json_file_path = './data/Instruction_Set.json'
-            else:
-                json_file_path = './data/Completion_Set.json'
-                
-            with open(json_file_path, 'r') as file:
-                self.instruction_set = json.load(file)
-            logger.info(f"Loaded {json_file_path} successfully")
+            # Tasks are indexed by program name and shared between evaluator instances
+            self.task_store = task_store or TaskStore.for_mode(self.mode)
+            logger.info(f"Loaded {self.task_store.path} successfully")
     
         except Exception as e:
             logger.error(f"Error occurred while reading JSON file: {e}")
     
+        # With a result store, programs are read from it and results are stored as the
+        # "compile" stage instead of a CSV copying every program again
+        self.store = store
         try:
-            self.df = pd.read_csv(csv_path)
+            if store:
+                self.df = store.read(self.model, self.mode, columns=[
+                    'Cobol_Eval', 'Generated_program', 'Expected_Program', 'Bert_score'
+                ])
+            else:
+                self.df = pd.read_csv(csv_path)
             logger.info(f"Data frame read successfully")
         
         except Exception as e:
@@ -46,32 +106,38 @@ class CompileExecute:
         self.total = 0
         self.compiled = 0
         self.executed = 0
+        # Guards the counters above when programs are evaluated by several workers
+        self._lock = threading.Lock()
 
-    def create_input_files(self, program_name):
+    def task_file_names(self, program_name, key):
+        """
+        Return the input or output file names of a task as a list.
+        Args:
+            program_name (str): The benchmark program name.
+            key (str): 'input_file_names' or 'output_file_names'.
+        Returns:
+            list: The file names, empty if the task has none.
+        """
+        task = self.task_store.get(program_name)
+        return getattr(task, key) if task else []
+
+    def create_input_files(self, program_name, program_dir=None):
         """
         Create input files for the given program name.
         Args:
             program_name (str): The name of the program for which to create input files.
+            program_dir (str): Folder the program runs in, defaults to its folder under output_path.
         Returns:
             bool: True if input files were created successfully, False otherwise.
         """
+        program_dir = program_dir or os.path.join(self.output_path, program_name)
         try:
-            res = next((item for item in self.instruction_set if item['Program_name'] == program_name), None)
-            input_file_names = res['input_file_names']
-
-            if isinstance(input_file_names, list) and input_file_names != "":
-                for input_file in input_file_names:
-                    input_file_path = os.path.join(self.output_path, program_name, input_file)
-                    print("*Input File Path:",input_file_path,end="")
-                    with open(input_file_path, "w+") as f:
-                        f.write(res['inputs'][input_file])
-                    
-
-            elif isinstance(input_file_names, str) and input_file_names != "":
-                input_file_path = os.path.join(self.output_path, program_name, input_file_names)
-                print("*Input File Path:",input_file_path)
+            task = self.task_store.get(program_name)
+            for input_file in task.input_file_names:
+                input_file_path = os.path.join(program_dir, input_file)
+                logger.debug(f"Input file path: {input_file_path}")
                 with open(input_file_path, "w+") as f:
-                    f.write(res['inputs'][input_file_names])
+                    f.write(task.inputs[input_file])
             
             return True
 
@@ -79,72 +145,66 @@ class CompileExecute:
             logger.error(f"error creating input files {e}")
             return False
     
+    def expected_programs(self, rows):
+        """
+        Return the expected program of every row, from the CSV or else from the task store.
+        A row with neither gets None, which similarity_scores() scores 0.0 rather than
+        comparing the program against an empty one; the rest of the run goes on.
+        """
+        column = next((name for name in self.EXPECTED_COLUMNS if name in self.df), None)
+        programs = []
+        missing = set()
+        for row in rows:
+            if column and not pd.isna(row[column]):
+                programs.append(str(row[column]))
+                continue
+            task = self.task_store.get(row['Program_name'])
+            if task is None:
+                if row['Program_name'] not in missing:
+                    missing.add(row['Program_name'])
+                    logger.warning(f"No expected program for {row['Program_name']}: the CSV has no "
+                                   f"{' or '.join(self.EXPECTED_COLUMNS)} value and {self.task_store.path} "
+                                   f"has no such task, scoring its code similarity 0.0")
+                programs.append(None)
+                continue
+            programs.append(task.expected_program)
+        return programs
+
     def code_similarity_score(self,code1, code2):
         """
         Calculate the similarity score between two code snippets.
         Returns a float between 0.0 and 1.0.
         """
-        logger.info(code1[:10],"****",code2[:10])
-        # Use difflib's SequenceMatcher to compare the two codes
-        sequence_matcher = difflib.SequenceMatcher(None, code1, code2)
-        
-        # Get the similarity ratio (between 0.0 and 1.0)
-        return sequence_matcher.ratio()    
+        # Token-level COBOL similarity, see code_similarity.py
+        return code_similarity(code1, code2)
        
-    def compare_results(self, program_name):
+    def compare_results(self, program_name, program_dir=None):
         """
         Compare the actual output of the program with the expected output.
         Args:
             program_name (str): The name of the program to compare.
+            program_dir (str): Folder the program ran in, defaults to its folder under output_path.
         Returns:
             float: The similarity score between the actual and expected output.
         """
-        try:            
-            res = next((item for item in self.instruction_set if item['Program_name'] == program_name), None)
-            if not res:
+        program_dir = program_dir or os.path.join(self.output_path, program_name)
+        try:
+            task = self.task_store.get(program_name)
+            if not task:
                 return 0.0
                 
-            output_file_names = res['output_file_names']
             similarity_scores = []
-            if isinstance(output_file_names, list) and output_file_names:
-                for output_file in output_file_names:
-                    output_file_path = os.path.join(self.output_path, program_name, output_file)
-                    
-                    # Return 0.0 if file doesn't exist
-                    if not os.path.exists(output_file_path):
-                        return 0.0
-                    
-                    with open(output_file_path, "r") as f:
-                        actual_output = f.read()
-                    
-                    expected_output = res['outputs'].get(output_file, "")
-                    
-                    # Calculate similarity score (0-100 as integer)
-                    exact_match = 1.0 if actual_output == expected_output else 0.0
-                    edit_distance = fuzz.ratio(actual_output, expected_output) / 100.0
-                    
-                    # Average of EM and ED
-                    score = (exact_match + edit_distance) / 2.0
-                    similarity_scores.append(score)
-            
-            elif isinstance(output_file_names, str) and output_file_names:
-                output_file_path = os.path.join(self.output_path, program_name, output_file_names)
+            for output_file in task.output_file_names:
+                output_file_path = os.path.join(program_dir, output_file)
                 
                 # Return 0.0 if file doesn't exist
                 if not os.path.exists(output_file_path):
                     return 0.0
                 
-                with open(output_file_path, "r") as f:
-                    actual_output = f.read()
-                
-                expected_output = res['outputs'].get(output_file_names, "")
+                expected_output = task.outputs.get(output_file, "")
                 
-                # Calculate similarity score
-                exact_match = 1.0 if actual_output == expected_output else 0.0
-                edit_distance = fuzz.ratio(actual_output, expected_output) / 100.0
-                
-                # Average of EM and ED
-                score = (exact_match + edit_distance) / 2.0
+                # Average of EM and ED, streamed and bounded in cost
+                score = self.comparator.compare(output_file_path, expected_output)
                 similarity_scores.append(score)
             
             # Return average score across all files if there are multiple,
@@ -155,180 +215,323 @@ class CompileExecute:
             logger.error(f"Error comparing results for {program_name}: {e}")
             return 0.0    
 
-    def compile(self):
-        compiled_res = []
-        executed = []
-        result_match = []
-        code_similarity_scores = []
-        
+    def compile_program(self, program, program_path, output_executable, program_dir):
+        """
+        Build a program with cobc, reusing a cached build when one exists.
+        Args:
+            program (str): The COBOL source written to `program_path`.
+            program_path (str): Path of the .cbl file.
+            output_executable (str): Path the executable should be written to.
+            program_dir (str): Working directory for cobc.
+        Returns:
+            int: The cobc return code (0 on success).
+        """
+        cache_key = None
+        if self.compile_cache:
+            cache_key = self.compile_cache.key(program, self.compile_flags)
+            entry = self.compile_cache.lookup(cache_key)
+            if entry:
+                logger.info(f"Compile cache hit for {os.path.basename(program_path)}")
+                if entry['returncode'] == 0:
+                    self.compile_cache.restore(entry, output_executable)
+                else:
+                    logger.error(entry['stderr'])
+                return entry['returncode']
+
+        # compile cmd
+        compile_cmd = ['cobc', *self.compile_flags, '-o', output_executable, program_path]
+        compile_result = launch(compile_cmd, cwd=program_dir)
+        if compile_result.returncode != 0:
+            logger.error(compile_result.stderr)
+
+        if cache_key:
+            self.compile_cache.store(cache_key, compile_result.returncode, compile_result.stderr,
+                                     output_executable if compile_result.returncode == 0 else None)
+        return compile_result.returncode
+
+    def module_runner(self):
+        """Return the module runner of the calling worker thread, starting one if needed."""
+        runner = getattr(self._runners, "runner", None)
+        if runner is None:
+            runner = ModuleRunner(self.limits)
+            self._runners.runner = runner
+            with self._lock:
+                self._all_runners.append(runner)
+        return runner
+
+    def close_runners(self):
+        """Stop every module runner started by this evaluator."""
+        with self._lock:
+            runners, self._all_runners = self._all_runners, []
+        for runner in runners:
+            runner.close()
+        self._runners = threading.local()
+
+    def build_and_run(self, program, program_name, program_dir, result, workspace=None):
+        """
+        Write, compile, execute and compare a program inside `program_dir`.
+        Args:
+            program (str): The COBOL source to evaluate.
+            program_name (str): The benchmark program name.
+            program_dir (str): The folder the program is built and run in.
+            result (dict): The per-program result, updated in place.
+            workspace (Workspace): The ephemeral workspace `program_dir` belongs to, if any.
+        """
+        program_path = os.path.join(program_dir, f"{program_name}.cbl")
+
+        with open(program_path, "w+") as f:
+            f.write(program)
+
+        logger.info(f"compiling {program_name}")
+        if workspace:
+            workspace.add_artifact("source", os.path.basename(program_path))
+
+        if self.exec_mode == "module":
+            output_executable = os.path.join(program_dir, f'{program_name}.so')
+        else:
+            output_executable = os.path.join(program_dir, f'{program_name}')
+
         try:
-            total_rows = len(self.df)
-            logger.info(f"Processing {total_rows} programs")
-            
-            for index, row in self.df.iterrows():
-                try:
-                    program = str(row['Generated_program'])
-                    expected_program = str(row['Expected_program'])
-                    logger.info(f"Processing program {index+1}/{total_rows}: {row['Program_name']}")
-                    
-                    # Initialize with 0 values in case of any errors
-                    code_similarity = 0.0
-                    compiled = 0
-                    executed_flag = 0
-                    result_score = 0.0
-                    
-                    # Code similarity calculation
-                    logger.info(f"Code Similarity score started")
-                    try:
-                        # Uncomment this to enable code similarity scoring
-                        # code_similarity = self.code_similarity_score(program, expected_program)
-                        # Round to 2 decimal places
-                        code_similarity = 0.0  # Placeholder 
-                    except Exception as e:
-                        logger.error(f"Error calculating code similarity: {e}")
-                    
-                    code_similarity_scores.append(round(code_similarity, 2))
-                    
-                    # Compilation
-                    logger.info(f"Compilation started")
-                    if not program.startswith("       IDENTIFICATION DIVISION."):
-                        program = "       " + program.lstrip()
-                    
-                    program_name = f"{row['Program_name']}"
-                    program_folder_path = os.path.join(self.output_path, program_name)
+            compile_returncode = self.compile_program(program, program_path, output_executable, program_dir)
 
-                    os.makedirs(program_folder_path, exist_ok=True)
-                    program_path = os.path.join(program_folder_path, f"{program_name}.cbl")
-                    
-                    with open(program_path, "w+") as f:
-                        f.write(program)
-                    
-                    logger.info(f"compiling {program_name}")
-                
-                    # change to program directory to execute
-                    program_dir = os.path.join(self.output_path, program_name)
-                    os.chdir(program_dir)
+            if compile_returncode == 0:
+                result['Compiled'] = 1
+                if workspace:
+                    workspace.add_artifact("executable", os.path.basename(output_executable))
+                with self._lock:
+                    self.compiled += 1
+                logger.success(f"{program_name} is successfully compiled")
 
-                    output_executable = os.path.join(program_dir, f'{program_name}')
-                    # compile cmd
-                    compile_cmd = f'cobc -x -o {output_executable} {program_path}'
-                    
+                # Create Input files
+                if self.create_input_files(program_name, program_dir):
+                    if workspace:
+                        for name in self.task_file_names(program_name, 'input_file_names'):
+                            workspace.add_artifact("inputs", name)
                     try:
-                        compile_result = utils.cmd(compile_cmd)
-                    
-                        if compile_result.returncode == 0:
-                            compiled = 1
-                            self.compiled += 1
-                            logger.success(f"{program_name} is successfully compiled")
-
-                            # Create Input files
-                            if self.create_input_files(program_name):
-                                try:
-                                    execute_cmd = f'./{program_name}'
-                                    execute_result = utils.cmd(execute_cmd)
-                                    if execute_result.returncode == 0:
-                                        executed_flag = 1
-                                        self.executed += 1
-                                        logger.success(f"{program_name} is successfully executed")
-
-                                        # Compare results
-                                        result_score = self.compare_results(program_name)
-                                    else:
-                                        logger.error(f"Execution failed for {program_name}")
-                                except Exception as e:
-                                    logger.error(f"Execution error for {program_name}: {e}")
-                            else:
-                                logger.error(f"Error occurred while creating input files for {program_name}")
+                        if self.exec_mode == "module":
+                            execute_result = self.module_runner().run(
+                                output_executable, entry_points(program, program_name), program_dir)
                         else:
-                            logger.error(f"Compilation failed for {program_name}")
+                            execute_cmd = [f'./{program_name}']
+                            execute_result = launch(execute_cmd, cwd=program_dir, limits=self.limits)
+                        result['Exec_status'] = execute_result.status
+                        if workspace:
+                            for name in self.task_file_names(program_name, 'output_file_names'):
+                                workspace.add_artifact("outputs", name)
+                        if execute_result.status == "ok":
+                            result['Executed'] = 1
+                            with self._lock:
+                                self.executed += 1
+                            logger.success(f"{program_name} is successfully executed")
+
+                            # Compare results
+                            result['Result_match'] = round(self.compare_results(program_name, program_dir), 2)
+                        else:
+                            logger.error(f"Execution failed for {program_name}: {execute_result.status} "
+                                         f"(return code {execute_result.returncode}, {execute_result.duration:.1f}s, "
+                                         f"peak RSS {execute_result.peak_rss_kb} KB)")
                     except Exception as e:
-                        logger.error(f"Compilation error for {program_name}: {e}")
-                    
-                    # Append results for this program
-                    compiled_res.append(compiled)
-                    executed.append(executed_flag)
-                    result_match.append(round(result_score, 2))
-                    
-                except Exception as e:
-                    logger.error(f"Error processing program {row.get('Program_name', f'at index {index}')}: {e}")
-                    # Ensure lists stay the same length by adding default values
-                    if len(code_similarity_scores) < index + 1:
-                        code_similarity_scores.append(0.0)
-                    if len(compiled_res) < index + 1:
-                        compiled_res.append(0)
-                    if len(executed) < index + 1:
-                        executed.append(0)
-                    if len(result_match) < index + 1:
-                        result_match.append(0.0)
-
-            # Ensure all arrays are the same length
-            list_length = len(self.df)
-            compiled_res = compiled_res[:list_length] + [0] * (list_length - len(compiled_res))
-            executed = executed[:list_length] + [0] * (list_length - len(executed))
-            result_match = result_match[:list_length] + [0.0] * (list_length - len(result_match))
-            code_similarity_scores = code_similarity_scores[:list_length] + [0.0] * (list_length - len(code_similarity_scores))
-
-            # Create the final results DataFrame
-            final_results = pd.DataFrame({
-                'Program_name': self.df['Program_name'],
-                'Cobol_Eval': self.df['Cobol_Eval'],
-                'Generated_program': self.df['Generated_program'],
-                'Expected_program': self.df['Expected_program'],
-                'Bert_score': self.df['Bert_score'],
-                'Code Similarity Score': code_similarity_scores,
-                'Compiled': compiled_res,
-                'Executed': executed,
-                'Result_match': result_match
-            })
+                        logger.error(f"Execution error for {program_name}: {e}")
+                else:
+                    logger.error(f"Error occurred while creating input files for {program_name}")
+            else:
+                logger.error(f"Compilation failed for {program_name}")
+        except Exception as e:
+            logger.error(f"Compilation error for {program_name}: {e}")
 
-            logger.success(f"Compilation completed")
-            logger.info(f"Total programs compiled: {sum(compiled_res)} \nTotal programs executed: {sum(executed)} \nTotal results matched: {sum(result_match)}")
-            
-            # Save results
-            try:
-                # Get the directory of the current script
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                # Navigate to the parent directory
-                parent_dir = os.path.dirname(current_dir)
-                # Change to the parent directory
-                os.chdir(parent_dir)
-                
-                compile_results_dir = f"final_results/{self.mode}"
-                if not os.path.exists(compile_results_dir):
-                    os.makedirs(compile_results_dir, exist_ok=True)
-                    logger.info("final_results directory created")
+    def row_dir(self, index, row):
+        """
+        Return the folder a row is built and run in under output_path.
+        Every sample of a task gets its own sub-folder (named by sample_id, or by the
+        row index for CSVs without sample ids), so concurrent samples of one task never
+        share their source, binary, input or output files.
+        """
+        sample_id = row.get('sample_id')
+        name = str(int(sample_id)) if sample_id is not None and not pd.isna(sample_id) else f"row-{index}"
+        return os.path.join(self.output_path, str(row['Program_name']), name)
 
-                logger.info(f"final_results directory path: {os.path.abspath(compile_results_dir)}")
+    @staticmethod
+    def prepare_program(program):
+        """Return the source written to the .cbl file, with the first line indented to column 8."""
+        program = str(program)
+        if not program.startswith("       IDENTIFICATION DIVISION."):
+            program = "       " + program.lstrip()
+        return program
 
-                # When saving final results
-                final_results_path = os.path.join(compile_results_dir, f"{self.model}_{self.mode}_final_results.csv")
-                final_results.to_csv(final_results_path, index=False)
-                logger.info(f"Results saved to {final_results_path}")
-            except Exception as e:
-                logger.error(f"Error saving results: {e}")
+    def evaluate_program(self, index, row, check=None, similarity=0.0):
+        """
+        Compile, execute and score a single generated program.
+
+        Each program sample is built and run inside its own folder (see row_dir), which
+        is passed to the subprocess as its working directory, so several programs can be
+        evaluated concurrently without touching the process-wide cwd.
+        Args:
+            index (int): Position of the program in the input CSV.
+            row (dict): The CSV row holding the generated and expected programs.
+            check (PreflightResult): The pre-flight result of the program, if it was checked.
+            similarity (float): The code similarity score of the program, computed for all rows at once.
+        Returns:
+            dict: The 'Code Similarity Score', 'Preflight', 'Compiled', 'Executed', 'Exec_status'
+            and 'Result_match' values.
+        """
+        result = {
+            **self.EMPTY_RESULT,
+            'Code Similarity Score': similarity,
+            'Preflight': 'ok' if check is None or check.ok else check.reason
+        }
+        try:
+            program = str(row['Generated_program'])
+            logger.info(f"Processing program {index+1}/{len(self.df)}: {row['Program_name']}")
+
+            # Compilation
+            program_name = f"{row['Program_name']}"
+            if check is not None and not check.ok:
+                logger.warning(f"Skipping compilation of {program_name}: pre-flight check failed ({check.reason})")
+                return result
+            if check is not None and check.warnings:
+                logger.warning(f"Pre-flight warnings for {program_name}: {', '.join(check.warnings)}")
+
+            logger.info(f"Compilation started")
+            program = self.prepare_program(program)
+            if self.ephemeral:
+                with Workspace(program_name, self.scratch_root) as workspace:
+                    self.build_and_run(program, program_name, workspace.path, result, workspace)
+                    workspace.keep(self.keep, self.row_dir(index, row))
+            else:
+                program_dir = self.row_dir(index, row)
+                os.makedirs(program_dir, exist_ok=True)
+                self.build_and_run(program, program_name, program_dir, result)
+
+        except Exception as e:
+            logger.error(f"Error processing program {row.get('Program_name', f'at index {index}')}: {e}")
+
+        return result
+
+    def checkpointed_evaluate(self, index, row, check=None, similarity=0.0, done=None):
+        """
+        Evaluate a program unless the checkpoint already holds its result.
+        Args:
+            index (int): Position of the program in the input CSV.
+            row (dict): The CSV row holding the generated and expected programs.
+            check (PreflightResult): The pre-flight result of the program, if it was checked.
+            similarity (float): The code similarity score of the program.
+            done (dict): Checkpoint records from a previous run, keyed by program key.
+        Returns:
+            dict: The per-program result, see evaluate_program.
+        """
+        key = f"{index}:{row['Program_name']}"
+        if done and key in done:
+            logger.info(f"Skipping {row['Program_name']}, already evaluated")
+            # Checkpoints written before the pre-flight check existed have no 'Preflight' value
+            result = {name: done[key].get(name, 'ok' if name == 'Preflight' else 0) for name in self.RESULT_COLUMNS}
+            # Older checkpoints hold the 0.0 placeholder; the score is cheap and deterministic
+            result['Code Similarity Score'] = similarity
+            return result
+
+        result = self.evaluate_program(index, row, check, similarity)
+        self.checkpoint.append({'key': key, 'Program_name': row['Program_name'], **result})
+        return result
+
+    def results_frame(self, results):
+        """
+        Build the final results table.
+        Args:
+            results (list): Per-program results, see evaluate_program; rows without a
+                result (after an error) get EMPTY_RESULT.
+        Returns:
+            pd.DataFrame: The input columns present in the CSV followed by the result columns.
+        """
+        final_results = self.df[[name for name in self.INPUT_COLUMNS if name in self.df]].reset_index(drop=True)
+        results = list(results[:len(final_results)]) + [self.EMPTY_RESULT] * (len(final_results) - len(results))
+        for name in self.RESULT_COLUMNS:
+            final_results[name] = [result[name] for result in results]
+        return final_results
+
+    def save_results(self, final_results):
+        """Write the final results to the compile stage of the result store, or to a CSV."""
+        if self.store:
+            stage = final_results[['Program_name', *self.RESULT_COLUMNS]].assign(sample_id=self.df['sample_id'].values)
+            self.store.write_stage(self.model, self.mode, "compile", stage)
+            return
+        try:
+            compile_results_dir = self.results_dir
+            if not os.path.exists(compile_results_dir):
+                os.makedirs(compile_results_dir, exist_ok=True)
+                logger.info("final_results directory created")
+
+            logger.info(f"final_results directory path: {os.path.abspath(compile_results_dir)}")
+
+            # When saving final results
+            final_results_path = os.path.join(compile_results_dir, f"{self.model}_{self.mode}_final_results.csv")
+            final_results.to_csv(final_results_path, index=False)
+            logger.info(f"Results saved to {final_results_path}")
+        except Exception as e:
+            logger.error(f"Error saving results: {e}")
+
+    def compile(self):
+        results = []
+        
+        try:
+            total_rows = len(self.df)
+            rows = self.df.to_dict('records')
+            logger.info(f"Processing {total_rows} programs with {self.workers} worker(s)")
+
+            if self.resume:
+                done = self.checkpoint.load()
+                logger.info(f"Resuming from {self.checkpoint.path}: {len(done)} programs already evaluated")
+            else:
+                done = {}
+                self.checkpoint.reset()
+            evaluate = partial(self.checkpointed_evaluate, done=done)
+
+            if self.preflight:
+                checks = preflight_programs(self.prepare_program(row['Generated_program']) for row in rows)
+                rejected = sum(not check.ok for check in checks)
+                flagged = sum(bool(check.warnings) for check in checks)
+                logger.info(f"Pre-flight check rejected {rejected} of {total_rows} programs ({flagged} with warnings)")
+            else:
+                checks = [None] * total_rows
+
+            similarities = similarity_scores([str(row['Generated_program']) for row in rows],
+                                             self.expected_programs(rows))
+
+            if self.workers > 1:
+                # Programs are independent and spend their time in cobc and the
+                # compiled binary, so a thread pool keeps every core busy.
+                # map() yields results in input order.
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    results = list(pool.map(evaluate, range(total_rows), rows, checks, similarities))
+            else:
+                results = [evaluate(index, row, check, similarity)
+                           for index, (row, check, similarity) in enumerate(zip(rows, checks, similarities))]
+            self.checkpoint.close()
+            self.close_runners()
+
+            final_results = self.results_frame(results)
+
+            logger.success(f"Compilation completed")
+            logger.info(f"Total programs compiled: {final_results['Compiled'].sum()} \nTotal programs executed: {final_results['Executed'].sum()} \nTotal results matched: {final_results['Result_match'].sum()}")
+            status_counts = final_results['Exec_status'].value_counts().to_dict()
+            logger.info(f"Execution outcomes: {status_counts}")
+            preflight_counts = final_results['Preflight'].value_counts().to_dict()
+            logger.info(f"Pre-flight outcomes: {preflight_counts}")
+            if self.compile_cache:
+                stats = self.compile_cache.stats()
+                logger.info(f"Compile cache hits: {stats['hits']} \nCompile cache misses: {stats['misses']}")
             
+            self.save_results(final_results)
             return final_results
 
         except Exception as e:
             logger.error(f"Error occurred during compilation: {e}")
-            # Try to create a basic results DataFrame with available data
+            # Keep the results of the programs evaluated so far, with every result column
             try:
-                # Ensure all arrays have the same length
-                list_length = len(self.df)
-                compiled_res = compiled_res[:list_length] + [0] * (list_length - len(compiled_res))
-                executed = executed[:list_length] + [0] * (list_length - len(executed))
-                result_match = result_match[:list_length] + [0.0] * (list_length - len(result_match))
-                code_similarity_scores = code_similarity_scores[:list_length] + [0.0] * (list_length - len(code_similarity_scores))
-                
-                final_results = pd.DataFrame({
-                    'Program_name': self.df['Program_name'],
-                    'Compiled': compiled_res,
-                    'Executed': executed,
-                    'Result_match': result_match
-                })
-                
+                self.checkpoint.close()
+                self.close_runners()
+                final_results = self.results_frame(results)
                 logger.error("Created partial results due to error")
                 logger.info(final_results)
+                self.save_results(final_results)
                 return final_results
             except Exception as e:
                 logger.error(f"Could not create results dataframe: {e}")
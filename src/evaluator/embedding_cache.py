@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import threading
+from loguru import logger
+import numpy as np
+from src.utils.disk_cache import atomic_open
+
+# Bumped whenever the layout of the stored arrays changes
+CACHE_FORMAT = 1
+
+
+class ReferenceEmbeddingCache:
+    """
+    On-disk cache of BERTScore reference embeddings.
+
+    Every model, mode and re-run scores against the same expected programs, so their
+    token embeddings and IDF weights are computed once and stored as .npy files that
+    are memory-mapped on load; later runs only encode the candidates. Entries are
+    keyed on the reference text and the scorer hash, which covers the model, layers,
+    IDF and baseline settings and the bert_score and transformers versions, plus the
+    IDF weights themselves when IDF is enabled.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def idf_fingerprint(scorer):
+        """Digest of the scorer's IDF weights, empty when IDF is disabled."""
+        if not scorer.idf:
+            return ""
+        weights = json.dumps(sorted(scorer._idf_dict.items()))
+        return hashlib.sha256(weights.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def key(scorer_hash, idf_fingerprint, reference):
+        """
+        Compute the cache key of a reference.
+        Returns:
+            str: The hex digest identifying the reference embedding.
+        """
+        payload = json.dumps([CACHE_FORMAT, scorer_hash, idf_fingerprint, reference])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_paths(self, key):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.emb.npy", f"{base}.idf.npy"
+
+    def get(self, key):
+        """
+        Load a cached reference.
+        Returns:
+            tuple: Memory-mapped (embedding, idf) arrays, or None on a miss.
+        """
+        emb_path, idf_path = self._entry_paths(key)
+        try:
+            # The embedding is written last, so its presence means the entry is complete
+            embedding = np.load(emb_path, mmap_mode="r")
+            idf = np.load(idf_path, mmap_mode="r")
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return embedding, idf
+
+    def put(self, key, embedding, idf):
+        """Store the embedding and IDF weights of a reference."""
+        emb_path, idf_path = self._entry_paths(key)
+        for path, array in ((idf_path, idf), (emb_path, embedding)):
+            try:
+                with atomic_open(path, "wb") as f:
+                    np.save(f, array)
+            except OSError as e:
+                logger.warning(f"Could not store reference embedding {key}: {e}")
+                return
+
+    def score(self, scorer, cands, refs, batch_size=64):
+        """
+        Score candidate/reference pairs like BERTScorer.score, encoding only the
+        candidates and the references missing from the cache.
+        Args:
+            scorer (BERTScorer): The scorer whose model, tokenizer and settings are used.
+            cands (list): Candidate programs.
+            refs (list): Reference programs, one per candidate.
+            batch_size (int): Sentences encoded and pairs matched per forward pass.
+        Returns:
+            tuple: (P, R, F) tensors with one score per pair.
+        """
+        import torch
+        from collections import defaultdict
+        from bert_score.utils import greedy_cos_idf
+
+        if scorer.idf:
+            idf_dict = scorer._idf_dict
+        else:
+            idf_dict = defaultdict(lambda: 1.0)
+            idf_dict[scorer._tokenizer.sep_token_id] = 0
+            idf_dict[scorer._tokenizer.cls_token_id] = 0
+
+        scorer_hash = scorer.hash
+        fingerprint = self.idf_fingerprint(scorer)
+        stats = {}
+        missing = {}
+        for ref in set(refs):
+            key = self.key(scorer_hash, fingerprint, ref)
+            cached = self.get(key)
+            if cached is None:
+                missing[ref] = key
+            else:
+                embedding, idf = cached
+                stats[("ref", ref)] = (torch.from_numpy(np.array(embedding)), torch.from_numpy(np.array(idf)))
+
+        encoded = self._encode(scorer, sorted(missing), idf_dict, batch_size)
+        for ref, (embedding, idf) in encoded.items():
+            stats[("ref", ref)] = (embedding, idf)
+            self.put(missing[ref], embedding.numpy(), idf.numpy())
+        for cand, value in self._encode(scorer, sorted(set(cands)), idf_dict, batch_size).items():
+            stats[("cand", cand)] = value
+        if missing:
+            logger.debug(f"Encoded {len(missing)} references missing from the embedding cache")
+
+        device = next(scorer._model.parameters()).device
+        preds = []
+        with torch.no_grad():
+            for start in range(0, len(refs), batch_size):
+                ref_stats = self._pad([stats[("ref", ref)] for ref in refs[start:start + batch_size]], device)
+                cand_stats = self._pad([stats[("cand", cand)] for cand in cands[start:start + batch_size]], device)
+                P, R, F1 = greedy_cos_idf(*ref_stats, *cand_stats, scorer.all_layers)
+                preds.append(torch.stack((P, R, F1), dim=-1).cpu())
+        preds = torch.cat(preds, dim=1 if scorer.all_layers else 0)
+        if scorer.rescale_with_baseline:
+            preds = (preds - scorer.baseline_vals) / (1 - scorer.baseline_vals)
+        return preds[..., 0], preds[..., 1], preds[..., 2]
+
+    @staticmethod
+    def _encode(scorer, sentences, idf_dict, batch_size):
+        """Return the unpadded (embedding, idf) tensors of every sentence, on CPU."""
+        from bert_score.utils import get_bert_embedding
+
+        # Longest first, as bert_score does, so each batch pads little
+        sentences = sorted(sentences, key=lambda sentence: len(sentence.split(" ")), reverse=True)
+        stats = {}
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            embs, masks, padded_idf = get_bert_embedding(
+                batch, scorer._model, scorer._tokenizer, idf_dict, device=scorer.device, all_layers=scorer.all_layers
+            )
+            embs, masks, padded_idf = embs.cpu(), masks.cpu(), padded_idf.cpu()
+            for i, sentence in enumerate(batch):
+                length = masks[i].sum().item()
+                stats[sentence] = (embs[i, :length], padded_idf[i, :length])
+        return stats
+
+    @staticmethod
+    def _pad(stats, device):
+        """Pad a batch of (embedding, idf) pairs the way bert_score does."""
+        import torch
+        from torch.nn.utils.rnn import pad_sequence
+
+        embs = [embedding.to(device) for embedding, _ in stats]
+        idfs = [idf.to(device) for _, idf in stats]
+        lengths = torch.tensor([embedding.size(0) for embedding in embs], dtype=torch.long)
+        mask = torch.arange(int(lengths.max())).expand(len(embs), -1) < lengths.unsqueeze(1)
+        return (pad_sequence(embs, batch_first=True, padding_value=2.0), mask.to(device),
+                pad_sequence(idfs, batch_first=True))
+
+    def stats(self):
+        """Return the hit/miss counters for this run."""
+        return {"hits": self.hits, "misses": self.misses}
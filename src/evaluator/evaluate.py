@@ -5,7 +5,11 @@ from loguru import logger
 import pandas as pd
 import traceback
 from .score_evaluator import ScoreEvaluator
+from .embedding_cache import ReferenceEmbeddingCache
 from .compile_execute import CompileExecute
+from .workspace import ARTIFACT_KINDS
+from src.utils.models import ExecutionLimits
+from src.utils.result_store import ResultStore
 
 def setup_logger():
     """Configure logger settings"""
@@ -46,32 +50,153 @@ def parse_arguments():
         action="store_true",
         help="Calculate BERT score"
     )
+    parser.add_argument(
+        "--bert-batch-size", 
+        type=int, 
+        default=64,
+        help="Program pairs scored together by the BERT model"
+    )
+    parser.add_argument(
+        "--bert-embedding-cache", 
+        type=str, 
+        default=None,
+        help="Directory of a persistent cache of reference embeddings for BERT score (disabled if not set)"
+    )
+    parser.add_argument(
+        "--bert-workers", 
+        type=int, 
+        default=1,
+        help="Processes scoring BERT batches in parallel on CPU, each loading its own model"
+    )
     parser.add_argument(
         "--compile-execute", 
         action="store_true",
         help="Compile and execute the generated code"
     )
+    parser.add_argument(
+        "--workers", 
+        type=int, 
+        default=1,
+        help="Number of programs to compile and execute in parallel"
+    )
+    parser.add_argument(
+        "--compile-cache", 
+        type=str, 
+        default=None,
+        help="Directory of a persistent compilation cache (disabled if not set)"
+    )
+    parser.add_argument(
+        "--compile-cache-size", 
+        type=int, 
+        default=1024,
+        help="Maximum size of the compilation cache in MB"
+    )
+    parser.add_argument(
+        "--timeout", 
+        type=float, 
+        default=10.0,
+        help="Wall-clock limit in seconds for each executed program"
+    )
+    parser.add_argument(
+        "--cpu-time", 
+        type=int, 
+        default=10,
+        help="CPU time limit in seconds for each executed program"
+    )
+    parser.add_argument(
+        "--memory-limit", 
+        type=int, 
+        default=2048,
+        help="Address space limit in MB for each executed program"
+    )
+    parser.add_argument(
+        "--output-limit", 
+        type=int, 
+        default=64,
+        help="Largest output file in MB each executed program may write"
+    )
+    parser.add_argument(
+        "--ephemeral", 
+        action="store_true",
+        help="Build and run each program in a temporary workspace that is removed afterwards"
+    )
+    parser.add_argument(
+        "--scratch-root", 
+        type=str, 
+        default=None,
+        help="Directory for ephemeral workspaces (defaults to /dev/shm when available)"
+    )
+    parser.add_argument(
+        "--keep", 
+        nargs="*",
+        default=[],
+        choices=list(ARTIFACT_KINDS),
+        help="Artifacts to copy out of ephemeral workspaces into preds/"
+    )
+    parser.add_argument(
+        "--resume", 
+        action="store_true",
+        help="Skip programs already recorded in the checkpoint of an interrupted run"
+    )
+    parser.add_argument(
+        "--max-compare-cost", 
+        type=int, 
+        default=2000,
+        help="Line edits after which a large output file is scored as not matching"
+    )
+    parser.add_argument(
+        "--exec-mode", 
+        type=str, 
+        default="executable",
+        choices=["executable", "module"],
+        help="Run standalone executables (cobc -x) or modules in a persistent runner (cobc -m)"
+    )
+    parser.add_argument(
+        "--no-preflight", 
+        action="store_true",
+        help="Compile every program, even those the pre-flight check knows cobc will reject"
+    )
+    parser.add_argument(
+        "--store", 
+        type=str, 
+        default=None,
+        help="Root of a Parquet result store; stages then store their own columns there instead of CSV copies"
+    )
     return parser.parse_args()
 
-def run_bert_evaluation(model_name, csv_path):
-    """Run BERT score evaluation on generated results"""
+def import_programs(store, model_name, mode, csv_path):
+    """
+    Load the generation results into the result store, unless it already holds
+    programs at least as recent as the CSV.
+    """
+    path = store.stage_path(model_name, mode, "programs")
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(csv_path):
+        return
+    store.write_stage(model_name, mode, "programs", pd.read_csv(csv_path))
+
+def run_bert_evaluation(model_name, csv_path, mode="Instruct", resume=False, batch_size=64, embedding_cache_dir=None,
+                        store=None, workers=1):
+    """
+    Run BERT score evaluation on generated results.
+    Scores are saved to evaluation_results/<mode>/<model>_evaluation_results.csv (or
+    the result store); the compile stage does not read them.
+    """
     try:
-        if not os.path.exists(csv_path):
-            logger.error(f"File not found: {csv_path}")
-            return False
-
-        df = pd.read_csv(csv_path)
-        logger.info(f"Loaded {len(df)} records from {csv_path}")
-
-        golden_set = []
-        for _, row in df.iterrows():
-            try:
-                golden_set.append({
-                    "query": row.get('Cobol_Eval', ''),
-                    "expected_response": row.get('Expected_Program', '')
-                })
-            except KeyError as e:
-                logger.warning(f"Missing key in row: {e}")
+        if store:
+            df = store.read(model_name, mode, columns=['Cobol_Eval', 'Generated_program', 'Expected_Program'])
+            logger.info(f"Loaded {len(df)} records from {store.partition(model_name, mode)}")
+        else:
+            if not os.path.exists(csv_path):
+                logger.error(f"File not found: {csv_path}")
+                return False
+
+            df = pd.read_csv(csv_path)
+            logger.info(f"Loaded {len(df)} records from {csv_path}")
+
+        golden_set = [
+            {"query": row.get('Cobol_Eval', ''), "expected_response": row.get('Expected_Program', '')}
+            for row in df.to_dict('records')
+        ]
 
         # Make sure column names match what's expected in evaluate()
         instruction_set = df.rename(columns={
@@ -81,10 +206,25 @@ def run_bert_evaluation(model_name, csv_path):
             'expected_response': 'Expected_Program'
         })
 
+        results_dir = os.path.join("evaluation_results", mode.lower())
+        os.makedirs(results_dir, exist_ok=True)
+        checkpoint_path = os.path.join(results_dir, f"{model_name}_bert_checkpoint.jsonl")
+
         logger.info("Starting BERT score evaluation...")
-        scorer = ScoreEvaluator()
+        embedding_cache = ReferenceEmbeddingCache(embedding_cache_dir) if embedding_cache_dir else None
+        scorer = ScoreEvaluator(checkpoint_path=checkpoint_path, resume=resume, batch_size=batch_size,
+                                embedding_cache=embedding_cache, workers=workers)
         results = scorer.evaluate(golden_set, instruction_set, model_name)
         logger.success("BERT score evaluation completed successfully")
+
+        if store:
+            scores = instruction_set[['Program_name', 'sample_id']].assign(Bert_score=results['Bert_score'].values)
+            store.write_stage(model_name, mode, "bert", scores)
+            return results
+
+        results_path = os.path.join(results_dir, f"{model_name}_evaluation_results.csv")
+        results.to_csv(results_path, index=False)
+        logger.info(f"Results saved to {results_path}")
         return results
     
     except Exception as e:
@@ -92,14 +232,20 @@ def run_bert_evaluation(model_name, csv_path):
         logger.error(traceback.format_exc())
         return False
 
-def run_compile_evaluation(model_name, mode, csv_path):
-    """Run compilation and execution evaluation"""
+def run_compile_evaluation(model_name, mode, csv_path, workers=1, cache_dir=None, cache_size_mb=1024, limits=None,
+                           ephemeral=False, scratch_root=None, keep=(), resume=False, max_compare_cost=2000,
+                           exec_mode="executable", preflight=True, store=None):
+    """Run compilation and execution evaluation on the generation CSV at `csv_path` (or the result store)"""
     try:
-        from src.generator import Model
+        from src.utils import Model
         model = Model(name=model_name)
         
         logger.info(f"Starting compilation and execution evaluation for {model_name}...")
-        evaluator = CompileExecute(model, csv_path, mode)
+        evaluator = CompileExecute(model, csv_path, mode, workers=workers,
+                                   cache_dir=cache_dir, cache_size_mb=cache_size_mb, limits=limits,
+                                   ephemeral=ephemeral, scratch_root=scratch_root, keep=keep, resume=resume,
+                                   max_compare_cost=max_compare_cost, exec_mode=exec_mode,
+                                   preflight=preflight, store=store)
         results = evaluator.compile()
         
         logger.success("Compilation and execution evaluation completed")
@@ -135,24 +281,51 @@ def main():
         logger.error(f"CSV file not found: {csv_path}")
         return
     
+    limits = ExecutionLimits(
+        timeout=args.timeout,
+        cpu_time=args.cpu_time,
+        memory_mb=args.memory_limit,
+        output_mb=args.output_limit
+    )
+
+    store = None
+    if args.store:
+        store = ResultStore(args.store)
+        import_programs(store, model_name, mode, csv_path)
+
     # Run evaluations based on arguments
     if args.bert_score:
         logger.info("Running BERT score evaluation...")
-        run_bert_evaluation(model_name, csv_path)
+        run_bert_evaluation(model_name, csv_path, mode, resume=args.resume, batch_size=args.bert_batch_size,
+                            embedding_cache_dir=args.bert_embedding_cache, store=store,
+                            workers=args.bert_workers)
     
     if args.compile_execute:
         logger.info("Running compilation and execution evaluation...")
-        run_compile_evaluation(model_name, mode, csv_path)
+        run_compile_evaluation(model_name, mode, csv_path, workers=args.workers,
+                               cache_dir=args.compile_cache, cache_size_mb=args.compile_cache_size,
+                               limits=limits, ephemeral=args.ephemeral, scratch_root=args.scratch_root,
+                               keep=args.keep, resume=args.resume, max_compare_cost=args.max_compare_cost,
+                               exec_mode=args.exec_mode, preflight=not args.no_preflight, store=store)
     
     # If no specific evaluation requested, run both
     if not args.bert_score and not args.compile_execute:
         logger.info("Running all evaluations...")
         
         # BERT score evaluation
-        bert_results = run_bert_evaluation(model_name, csv_path)
+        bert_results = run_bert_evaluation(model_name, csv_path, mode, resume=args.resume,
+                                           batch_size=args.bert_batch_size,
+                                           embedding_cache_dir=args.bert_embedding_cache, store=store,
+                                           workers=args.bert_workers)
         
         # Compilation and execution evaluation
-        compile_results = run_compile_evaluation(model_name, mode, csv_path)
+        compile_results = run_compile_evaluation(model_name, mode, csv_path, workers=args.workers,
+                                                 cache_dir=args.compile_cache, cache_size_mb=args.compile_cache_size,
+                                                 limits=limits, ephemeral=args.ephemeral,
+                                                 scratch_root=args.scratch_root, keep=args.keep,
+                                                 resume=args.resume, max_compare_cost=args.max_compare_cost,
+                                                 exec_mode=args.exec_mode, preflight=not args.no_preflight,
+                                                 store=store)
         
         logger.success("All evaluations completed")
 
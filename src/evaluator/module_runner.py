@@ -0,0 +1,205 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import select
+import signal
+import tempfile
+import subprocess
+from dataclasses import replace
+from loguru import logger
+from src.utils.command_utils import resource_limits, limited_argv, classify_outcome, CAPTURE_LIMIT
+from src.utils.models import ExecutionLimits, ProcessResult
+
+RUNNER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cob_runner.py")
+
+
+def entry_points(source, fallback):
+    """
+    Candidate C symbols for a module's entry point.
+    cobc names the entry point after the PROGRAM-ID, encoding '-' as '__' and
+    prefixing names that start with a digit with '_'.
+    Args:
+        source (str): The COBOL program source.
+        fallback (str): Name to use when no PROGRAM-ID is found.
+    Returns:
+        list: Symbol names to try, most likely first.
+    """
+    match = re.search(r"PROGRAM-ID\.\s*['\"]?([A-Za-z0-9_-]+)", source, re.IGNORECASE)
+    name = match.group(1) if match else fallback
+    encoded = name.replace("-", "__")
+    if encoded[:1].isdigit():
+        encoded = "_" + encoded
+    candidates = []
+    for candidate in (encoded, encoded.upper(), encoded.lower()):
+        if candidate not in candidates:
+            candidates.append(candidate)
+    return candidates
+
+
+class ModuleRunner:
+    """
+    Runs COBOL modules inside a persistent cob_runner process.
+
+    The runner pays for interpreter start-up and libcob initialization once and then
+    executes many programs, each in a child forked from it, so STOP RUN, crashes and
+    resource limits end only that program. The runner is recycled after `max_jobs`
+    programs and when a program times out (its process group is killed).
+    """
+
+    def __init__(self, limits: ExecutionLimits = None, max_jobs=200):
+        self.limits = limits or ExecutionLimits()
+        self.max_jobs = max_jobs
+        self.proc = None
+        self.jobs = 0
+        self._requests = None
+        self._replies = None
+        self._capture_dir = tempfile.mkdtemp(prefix="cob-runner-")
+        self._stdout_path = os.path.join(self._capture_dir, "stdout")
+        self._stderr_path = os.path.join(self._capture_dir, "stderr")
+
+    def start(self):
+        request_read, request_write = os.pipe()
+        reply_read, reply_write = os.pipe()
+        # CPU time is limited per job by the runner itself, everything else per process
+        rlimits = resource_limits(replace(self.limits, cpu_time=0))
+
+        self.proc = subprocess.Popen(
+            limited_argv([sys.executable, RUNNER_SCRIPT, str(request_read), str(reply_write)], rlimits),
+            pass_fds=(request_read, reply_write),
+            stdin=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        os.close(request_read)
+        os.close(reply_write)
+        self._requests = os.fdopen(request_write, "w", buffering=1)
+        self._replies = os.fdopen(reply_read, "r")
+        self.jobs = 0
+        logger.info(f"Started COBOL module runner (pid {self.proc.pid})")
+
+    def _discard(self):
+        """Forget the current runner, killing it if it is still alive."""
+        if self.proc is None:
+            return
+        if self.proc.poll() is None:
+            try:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.proc.wait()
+        for pipe in (self._requests, self._replies):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        self.proc = None
+
+    def _read_capture(self, path):
+        """
+        Return the last CAPTURE_LIMIT bytes of a capture file, as launch() keeps them,
+        and whether anything before them was dropped.
+        """
+        try:
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                f.seek(max(0, size - CAPTURE_LIMIT))
+                return f.read(CAPTURE_LIMIT).decode("utf-8", errors="replace"), size > CAPTURE_LIMIT
+        except OSError:
+            return "", False
+
+    def _submit(self, job):
+        """
+        Hand a job to a live runner, starting one if needed.
+        A runner that died while idle is only noticed when the request cannot be
+        written (EPIPE), before it read the job, so the job is sent once more to a
+        fresh runner. Jobs that started are never retried.
+        """
+        for attempt in range(2):
+            if self.proc is None or self.proc.poll() is not None or self.jobs >= self.max_jobs:
+                self._discard()
+                self.start()
+            try:
+                self._requests.write(json.dumps(job) + "\n")
+                self.jobs += 1
+                return
+            except (BrokenPipeError, OSError):
+                logger.warning("Module runner exited while idle, starting a fresh one")
+                self._discard()
+        raise RuntimeError("Could not hand the job to a module runner")
+
+    def _run_once(self, module_path, entries, cwd):
+        for path in (self._stdout_path, self._stderr_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        job = {
+            "module": module_path,
+            "entries": entries,
+            "cwd": cwd,
+            "stdout": self._stdout_path,
+            "stderr": self._stderr_path,
+            "cpu_time": self.limits.cpu_time
+        }
+        start = time.monotonic()
+        timed_out = False
+        self._submit(job)
+        try:
+            # A timeout of 0 means no limit, as in launch()
+            ready, _, _ = select.select([self._replies], [], [], self.limits.timeout or None)
+            reply = self._replies.readline() if ready else None
+        except OSError:
+            reply = ""
+        duration = time.monotonic() - start
+
+        peak_rss_kb = 0
+        cpu_time = 0.0
+        if reply:
+            # The job ran in a child of the runner, which reports how it ended
+            reply = json.loads(reply)
+            returncode = reply["returncode"]
+            peak_rss_kb = reply.get("peak_rss_kb", 0)
+            cpu_time = reply.get("cpu_time", 0.0)
+        elif reply is None:
+            # Killing the runner's process group also kills the job's child
+            timed_out = True
+            self._discard()
+            returncode = -signal.SIGKILL
+        else:
+            # The runner itself died while the job ran, e.g. killed by the OOM killer
+            _, wait_status, usage = os.wait4(self.proc.pid, 0)
+            self.proc.returncode = returncode = os.waitstatus_to_exitcode(wait_status)
+            peak_rss_kb = usage.ru_maxrss
+            self._discard()
+
+        stdout, stdout_truncated = self._read_capture(self._stdout_path)
+        stderr, stderr_truncated = self._read_capture(self._stderr_path)
+        status = classify_outcome(returncode, timed_out, duration, self.limits, peak_rss_kb)
+        return ProcessResult(returncode=returncode, status=status, stdout=stdout, stderr=stderr, duration=duration,
+                             cpu_time=cpu_time, stdout_truncated=stdout_truncated,
+                             stderr_truncated=stderr_truncated, peak_rss_kb=peak_rss_kb)
+
+    def run(self, module_path, entries, cwd):
+        """
+        Run a module's entry point with `cwd` as working directory.
+        Args:
+            module_path (str): Path of the module built with `cobc -m`.
+            entries (list): Candidate entry point symbols, see entry_points().
+            cwd (str): Working directory for the program.
+        Returns:
+            ProcessResult: The return code, outcome status and captured output.
+        """
+        logger.info(f"Running module {module_path} (cwd={cwd})")
+        return self._run_once(module_path, entries, cwd)
+
+    def close(self):
+        """Stop the runner and remove its capture files."""
+        if self.proc is not None:
+            try:
+                self._requests.close()
+                self.proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+            self._discard()
+        shutil.rmtree(self._capture_dir, ignore_errors=True)
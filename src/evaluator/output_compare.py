@@ -0,0 +1,98 @@
+import os
+import hashlib
+from fuzzywuzzy import fuzz
+from src.utils.edit_distance import indel_similarity
+
+# Bytes read per chunk while hashing an output file
+CHUNK_SIZE = 64 * 1024
+
+
+class OutputComparator:
+    """
+    Score a program's output file against the expected output.
+
+    The score is the average of exact match (EM) and edit-distance similarity (ED),
+    with a cost that stays bounded however much a runaway program wrote:
+    - the file is streamed through a hash first, so an exact match is confirmed
+      without reading it into memory or computing any edit distance;
+    - outputs up to `exact_limit` characters are scored with fuzz.ratio as before;
+    - larger outputs are compared line by line with a capped edit distance. Files
+      whose line count alone puts them more than `max_cost` edits away are scored
+      ED = 0.0 without reading past that point. Lines are read at most one byte
+      longer than the longest expected line (a longer line cannot match anyway) and
+      kept as digests, and a file larger than the expected output plus `max_cost`
+      lines of that length is scored ED = 0.0, so memory stays bounded even for
+      output without newlines.
+    """
+
+    def __init__(self, exact_limit=64 * 1024, max_cost=2000):
+        self.exact_limit = exact_limit
+        self.max_cost = max_cost
+
+    @staticmethod
+    def _digest(output_path):
+        digest = hashlib.sha256()
+        with open(output_path, "r", errors="replace") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), ""):
+                digest.update(chunk.encode("utf-8"))
+        return digest.hexdigest()
+
+    def edit_similarity(self, output_path, expected_output):
+        """
+        Edit-distance similarity between an output file and the expected output.
+        Args:
+            output_path (str): Path of the file the program wrote.
+            expected_output (str): The expected file content.
+        Returns:
+            float: A similarity between 0.0 and 1.0.
+        """
+        size = os.path.getsize(output_path)
+        if size <= self.exact_limit and len(expected_output) <= self.exact_limit:
+            with open(output_path, "r", errors="replace") as f:
+                actual_output = f.read()
+            return fuzz.ratio(actual_output, expected_output) / 100.0
+
+        expected_lines = [self._line_digest(line.encode("utf-8")) for line in expected_output.splitlines()]
+        line_limit = max((len(line.encode("utf-8")) for line in expected_output.splitlines()), default=0) + 1
+        byte_limit = len(expected_output.encode("utf-8")) + self.max_cost * (line_limit + 1)
+        # Reading one line more than the ceiling allows tells us the file is too long
+        max_lines = len(expected_lines) + self.max_cost + 1
+        actual_lines = []
+        read = 0
+        with open(output_path, "rb") as f:
+            while len(actual_lines) < max_lines:
+                line = f.readline(line_limit + 1)
+                if not line:
+                    break
+                read += len(line)
+                if len(line) > line_limit and not line.endswith(b"\n"):
+                    # Longer than every expected line: skip the rest without keeping it
+                    rest = line
+                    while rest and not rest.endswith(b"\n") and read <= byte_limit:
+                        rest = f.readline(CHUNK_SIZE)
+                        read += len(rest)
+                if read > byte_limit:
+                    return 0.0
+                actual_lines.append(self._line_digest(line.rstrip(b"\r\n")))
+        if len(actual_lines) == max_lines:
+            return 0.0
+        return indel_similarity(actual_lines, expected_lines, self.max_cost)
+
+    @staticmethod
+    def _line_digest(line):
+        return hashlib.blake2b(line, digest_size=16).digest()
+
+    def compare(self, output_path, expected_output):
+        """
+        Score an output file against the expected output.
+        Args:
+            output_path (str): Path of the file the program wrote.
+            expected_output (str): The expected file content.
+        Returns:
+            float: The average of exact match and edit-distance similarity.
+        """
+        expected_digest = hashlib.sha256(expected_output.encode("utf-8")).hexdigest()
+        if self._digest(output_path) == expected_digest:
+            # Identical outputs have a perfect edit-distance similarity as well
+            return 1.0
+        return (0.0 + self.edit_similarity(output_path, expected_output)) / 2.0
@@ -1,4 +1,5 @@
 import os
+import multiprocessing
 import concurrent.futures
 from typing import Union, Dict, Tuple, List
 from loguru import logger
@@ -6,16 +7,68 @@ from bert_score import BERTScorer
 import numpy as np
 import pandas as pd
 from transformers import AutoTokenizer, AutoModel
+from src.utils.checkpoint import CheckpointLog
+from .embedding_cache import ReferenceEmbeddingCache
+
+# BERTScorer settings used by every scorer, in this process and in the workers
+SCORER_OPTIONS = {"lang": "en", "rescale_with_baseline": True}
+
+# State of a scoring worker process, set up once by _init_worker
+_worker = {}
+
+
+def score_pairs(scorer, cands, refs, batch_size, embedding_cache=None):
+    """Return the BERT scores (precision) of candidate/reference pairs as a list."""
+    if embedding_cache:
+        return embedding_cache.score(scorer, cands, refs, batch_size=batch_size)[0].tolist()
+    return scorer.score(cands, refs, batch_size=batch_size)[0].tolist()
+
+
+def _init_worker(scorer_options, threads, cache_dir):
+    """Load the BERT scorer once per worker process, on its share of the CPU threads."""
+    import torch
+
+    torch.set_num_threads(threads)
+    _worker["scorer"] = BERTScorer(**scorer_options)
+    _worker["cache"] = ReferenceEmbeddingCache(cache_dir) if cache_dir else None
+
+
+def _score_shard(shard):
+    cands, refs, batch_size = shard
+    cache = _worker["cache"]
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    scores = score_pairs(_worker["scorer"], cands, refs, batch_size, cache)
+    if cache:
+        hits, misses = cache.hits - hits, cache.misses - misses
+    return scores, hits, misses
+
 
 class ScoreEvaluator:
     """
     Evaluate generated code against expected responses using multiple metrics.
     """
 
-    def __init__(self):
+    def __init__(self, checkpoint_path=None, resume=False, batch_size=64,
+                 embedding_cache: ReferenceEmbeddingCache = None, workers=1):
         # Lazy initialization of BERT scorer
         self.bert_scorer = None
         self.bert_scores = []
+        # Pairs scored together by the BERT model
+        self.batch_size = batch_size
+        # Optional on-disk cache of reference embeddings shared across models and runs
+        self.embedding_cache = embedding_cache
+        # Processes scoring batches in parallel, each with its own scorer
+        self.workers = max(1, int(workers or 1))
+        self.scorer_options = dict(SCORER_OPTIONS)
+        # Optional durable log of per-row scores so an interrupted run can be resumed
+        self.checkpoint = CheckpointLog(checkpoint_path) if checkpoint_path else None
+        self.resume = resume
+
+    def load_scorer(self):
+        """Create the BERT scorer on first use."""
+        if self.bert_scorer is None:
+            self.bert_scorer = BERTScorer(**self.scorer_options)
+        return self.bert_scorer
 
     def bert_score(self, expected_response: str, generated_response: str):
         """
@@ -28,9 +81,7 @@ class ScoreEvaluator:
         Returns:
             float: The BERT score.
         """
-        # Lazy initialization of BERT scorer
-        if self.bert_scorer is None:
-            self.bert_scorer = BERTScorer(lang="en", rescale_with_baseline=True)
+        self.load_scorer()
 
         if expected_response:
             bert_score = self.bert_scorer.score(
@@ -40,6 +91,65 @@ class ScoreEvaluator:
         else:
             return np.nan
 
+    def bert_score_batch(self, expected_responses: List[str], generated_responses: List[str], on_batch=None):
+        """
+        Calculate the BERT scores of many pairs, `batch_size` pairs at a time.
+
+        Pairs are sorted by length so each batch pads little, and the scores are
+        returned in input order. With several workers, batches are spread over a
+        process pool that splits the CPU threads between its processes.
+
+        Args:
+            expected_responses (List[str]): The expected programs.
+            generated_responses (List[str]): The generated programs, one per expected program.
+            on_batch (callable): Called with (pair indices, scores) as each batch finishes.
+
+        Returns:
+            List[float]: The BERT score of every pair.
+        """
+        # Character length is a close enough proxy for token length to group pairs
+        order = sorted(range(len(expected_responses)),
+                       key=lambda i: max(len(expected_responses[i]), len(generated_responses[i])))
+        batches = [order[start:start + self.batch_size] for start in range(0, len(order), self.batch_size)]
+        shards = [([generated_responses[i] for i in batch], [expected_responses[i] for i in batch], self.batch_size)
+                  for batch in batches]
+
+        if self.workers > 1 and len(batches) > 1:
+            results = self._score_in_pool(shards)
+        else:
+            scorer = self.load_scorer()
+            results = (score_pairs(scorer, cands, refs, batch_size, self.embedding_cache)
+                       for cands, refs, batch_size in shards)
+
+        scores = [0.0] * len(order)
+        scored = 0
+        for batch, batch_scores in zip(batches, results):
+            for i, score in zip(batch, batch_scores):
+                scores[i] = score
+            if on_batch:
+                on_batch(batch, batch_scores)
+            scored += len(batch)
+            logger.info(f"Scored {scored}/{len(order)} programs")
+        return scores
+
+    def _score_in_pool(self, shards):
+        """Yield the scores of every shard, in order, computed by a pool of worker processes."""
+        workers = min(self.workers, len(shards))
+        # Workers share the cores instead of each starting one thread per core
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        cache_dir = self.embedding_cache.cache_dir if self.embedding_cache else None
+        logger.info(f"Scoring with {workers} worker processes of {threads} threads each")
+        # Forking a process that already runs torch threads can deadlock, so workers are spawned
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=_init_worker,
+                initargs=(self.scorer_options, threads, cache_dir)) as pool:
+            for scores, hits, misses in pool.map(_score_shard, shards):
+                if self.embedding_cache:
+                    self.embedding_cache.hits += hits
+                    self.embedding_cache.misses += misses
+                yield scores
+
     def evaluate(self, golden_set: List[Dict], instruction_set: pd.DataFrame, model_name: str) -> pd.DataFrame:
         """
         Evaluate generated code against expected responses using multiple metrics.
@@ -61,9 +171,23 @@ class ScoreEvaluator:
             logger.error("Empty instruction set provided")
             return pd.DataFrame()
 
-        for index, row in instruction_set.iterrows():
+        done = {}
+        if self.checkpoint:
+            if self.resume:
+                done = self.checkpoint.load()
+                logger.info(f"Resuming from {self.checkpoint.path}: {len(done)} programs already scored")
+            else:
+                self.checkpoint.reset()
+
+        # Collect the rows still to score, then score them together in batches
+        self.bert_scores = [0.0] * len(instruction_set)
+        pending = []
+        for position, (index, row) in enumerate(zip(instruction_set.index, instruction_set.to_dict('records'))):
             program_name = row.get('Program_name', f"Row {index}")
-            logger.info(f"Processing {program_name}")
+            key = f"{index}:{program_name}"
+            if key in done:
+                self.bert_scores[position] = done[key]['Bert_score']
+                continue
 
             query = str(row.get('Cobol_Eval', ''))
             generated_response = str(row.get('Generated_program', ''))
@@ -71,12 +195,27 @@ class ScoreEvaluator:
 
             if not query or not generated_response or not expected_response:
                 logger.warning(f"Missing data in row {index} for program {program_name}")
-                self.bert_scores.append(0.0)
                 continue
-
-            b_score = self.bert_score(expected_response, generated_response)
-            logger.info(f"{program_name} - BERT Score: {b_score:.2f}")
-            self.bert_scores.append(b_score)
+            pending.append((position, key, program_name, expected_response, generated_response))
+
+        def on_batch(indices, scores):
+            for i, b_score in zip(indices, scores):
+                position, key, program_name, _, _ = pending[i]
+                logger.info(f"{program_name} - BERT Score: {b_score:.2f}")
+                self.bert_scores[position] = b_score
+                if self.checkpoint:
+                    self.checkpoint.append({'key': key, 'Program_name': program_name, 'Bert_score': b_score})
+
+        try:
+            if pending:
+                logger.info(f"Scoring {len(pending)} programs in batches of {self.batch_size}")
+                self.bert_score_batch([item[3] for item in pending], [item[4] for item in pending], on_batch)
+        finally:
+            if self.checkpoint:
+                self.checkpoint.close()
+        if self.embedding_cache:
+            stats = self.embedding_cache.stats()
+            logger.info(f"Reference embedding cache hits: {stats['hits']} \nReference embedding cache misses: {stats['misses']}")
 
         # Create results DataFrame
         evaluation_result = pd.DataFrame({
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from loguru import logger
+
+# Artifact kinds that can be copied out of an ephemeral workspace
+ARTIFACT_KINDS = ("source", "executable", "inputs", "outputs")
+
+
+def allows_exec(path):
+    """Whether programs can be executed from `path`, i.e. its file system is not mounted noexec."""
+    try:
+        return not os.statvfs(path).f_flag & getattr(os, "ST_NOEXEC", 0)
+    except OSError:
+        return False
+
+
+@lru_cache(maxsize=None)
+def default_scratch_root():
+    """
+    Pick the directory ephemeral workspaces are created in.
+    /dev/shm is a tmpfs on Linux, so builds and runs there never touch the disk.
+    It is skipped when it is not writable or mounted noexec (as Docker does by
+    default), since built programs could not run there; other systems fall back
+    to the regular temporary directory.
+    """
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        if allows_exec(shm):
+            return shm
+        logger.warning(f"{shm} is mounted noexec, building programs in {tempfile.gettempdir()} instead")
+    return tempfile.gettempdir()
+
+
+class Workspace:
+    """
+    A private, short-lived directory in which a single program is built and run.
+
+    The directory is removed when the workspace is closed. Only the artifacts that
+    were asked for are copied to a permanent location beforehand.
+    """
+
+    def __init__(self, name, scratch_root=None):
+        self.name = name
+        self.scratch_root = scratch_root or default_scratch_root()
+        os.makedirs(self.scratch_root, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=f"{name}-", dir=self.scratch_root)
+        self.artifacts = {kind: [] for kind in ARTIFACT_KINDS}
+
+    def add_artifact(self, kind, file_name):
+        """Register a file in the workspace (relative to it) as an artifact of `kind`."""
+        self.artifacts[kind].append(file_name)
+
+    def keep(self, kinds, destination):
+        """
+        Copy the artifacts of the given kinds out of the workspace.
+        Args:
+            kinds (Iterable[str]): Artifact kinds to keep, see ARTIFACT_KINDS.
+            destination (str): Directory the artifacts are copied to.
+        """
+        files = [name for kind in kinds for name in self.artifacts.get(kind, [])]
+        if not files:
+            return
+        os.makedirs(destination, exist_ok=True)
+        for name in files:
+            source = os.path.join(self.path, name)
+            if os.path.exists(source):
+                shutil.copy2(source, os.path.join(destination, name))
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+        if os.path.exists(self.path):
+            logger.warning(f"Could not remove workspace {self.path}")
+        return False
@@ -1,2 +1,9 @@
 from .llm_generator import LLMGenerator
-from .chat_model import ChatModelsGenerator
\ No newline at end of file
+
+
+def __getattr__(name):
+    # The chat clients pull in every provider SDK, so they are only imported when used
+    if name == "ChatModelsGenerator":
+        from .chat_model import ChatModelsGenerator
+        return ChatModelsGenerator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
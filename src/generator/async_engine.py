@@ -0,0 +1,125 @@
+import time
+import asyncio
+from loguru import logger
+from src.utils.models import GenerationOptions
+
+
+def estimate_tokens(text, max_tokens=0):
+    """Rough token count of a request: about four characters per prompt token plus the completion budget."""
+    return len(text) // 4 + max_tokens
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for a requests-per-minute and a tokens-per-minute budget.
+    Both buckets start full and refill continuously; a budget of 0 is unlimited.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    async def acquire(self, tokens=0):
+        """
+        Wait until one request of `tokens` tokens fits in the budget, then consume it.
+        A request larger than the whole token budget waits for a full bucket.
+        """
+        async with self._lock:
+            tokens = min(tokens, self.tokens_per_minute) if self.tokens_per_minute else 0
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute and self._requests < 1:
+                    wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+
+
+class AsyncGenerationEngine:
+    """
+    Runs generation requests concurrently, bounded per provider.
+
+    Every provider gets its own concurrency limit and rate budget from the
+    GenerationOptions, so a slow or throttled provider does not hold up another.
+    Results are handed to `on_result` as soon as each request finishes.
+    """
+
+    def __init__(self, options: GenerationOptions = None):
+        self.options = options or GenerationOptions()
+        self._semaphores = {}
+        self._limiters = {}
+
+    def _limits(self, provider):
+        if provider not in self._semaphores:
+            self._semaphores[provider] = asyncio.Semaphore(max(1, self.options.concurrency))
+            self._limiters[provider] = RateLimiter(self.options.requests_per_minute, self.options.tokens_per_minute)
+        return self._semaphores[provider], self._limiters[provider]
+
+    async def _request(self, provider, request, prompt, label):
+        """Run one request under the provider's limits, retrying with exponential backoff."""
+        semaphore, limiter = self._limits(provider)
+        attempts = max(1, self.options.retries + 1)
+        for attempt in range(attempts):
+            async with semaphore:
+                await limiter.acquire(estimate_tokens(prompt, self.options.max_tokens))
+                try:
+                    return await request()
+                except Exception as e:
+                    error = e
+            if attempt + 1 < attempts:
+                delay = 2 ** attempt
+                logger.warning(f"Request for {label} failed ({error}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+        logger.error(f"Request for {label} failed after {attempts} attempts: {error}")
+        return None
+
+    async def _run(self, jobs, on_result, on_close=None):
+        # Limits are created inside the event loop that uses them
+        self._semaphores, self._limiters = {}, {}
+
+        async def run_job(job):
+            provider, request, prompt, key = job
+            result = await self._request(provider, request, prompt, key)
+            on_result(key, result)
+
+        try:
+            await asyncio.gather(*(run_job(job) for job in jobs))
+        finally:
+            if on_close:
+                await on_close()
+
+    def run(self, jobs, on_result, on_close=None):
+        """
+        Run all jobs and return when every one has finished.
+        Args:
+            jobs (list): (provider, request, prompt, key) tuples, where `request` is a
+                zero-argument coroutine function making the call and `prompt` is used to
+                estimate its token cost.
+            on_result (callable): Called with (key, result) as each job finishes; result
+                is None if the request kept failing.
+            on_close (callable): Coroutine function awaited before the event loop closes,
+                e.g. to close async clients bound to it.
+        """
+        started = time.monotonic()
+        asyncio.run(self._run(jobs, on_result, on_close))
+        logger.info(f"Finished {len(jobs)} requests in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,223 @@
+import os
+import re
+import json
+import time
+import hashlib
+from loguru import logger
+from .chat_model import COBOL_SYSTEM_PROMPT, gpt_messages, claude_messages
+from .providers import ProviderRegistry, provider_for, registry as default_registry
+
+# Batch states after which the provider will not produce more results
+GPT_FINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+# Longest custom id the providers accept
+MAX_CUSTOM_ID = 64
+
+
+def custom_id(program_name, sample_id):
+    """
+    Stable batch custom id of a sample, `<program name>-<sample_id>`.
+    Custom ids may only hold letters, digits, '-' and '_'; names that need escaping
+    or shortening get a digest of the original name so ids stay unique.
+    """
+    name = str(program_name)
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", name)
+    suffix = f"-{sample_id}"
+    if safe != name or len(safe) + len(suffix) > MAX_CUSTOM_ID:
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()[:12]
+        safe = f"{safe[:MAX_CUSTOM_ID - len(suffix) - len(digest) - 1]}-{digest}"
+    return f"{safe}{suffix}"
+
+
+class BatchSubmitter:
+    """
+    Generates many prompts with one job of a provider's batch API.
+
+    All requests are written to a JSONL batch file, submitted in one go, polled until
+    the provider has processed them and read back by custom id. Batch jobs are
+    cheaper than one synchronous request per prompt and are not subject to the
+    per-minute rate limits, at the cost of latency. GPT (Azure OpenAI batch files)
+    and Claude (message batches) are supported.
+
+    The id of a submitted batch is kept in a state file next to the batch file, with
+    a fingerprint of every request line (custom id, prompt and generation settings,
+    in order), so a run interrupted while polling attaches to the same batch instead
+    of paying for a second one, and any other set of requests submits its own batch.
+    """
+
+    def __init__(self, model, max_tokens=4096, temperature=0.3, poll_interval=30, registry: ProviderRegistry = None):
+        """
+        Args:
+            model (str): The model (or Azure deployment) name.
+            max_tokens (int): Maximum number of tokens to generate per request.
+            temperature (float): Sampling temperature.
+            poll_interval (float): Seconds between two status checks of the batch.
+            registry (ProviderRegistry): The registry holding the provider clients.
+        """
+        self.model = model
+        self.provider = provider_for(model)
+        if self.provider not in ("GPT", "CLAUDE"):
+            raise ValueError(f"Batch submission is not supported for {model}")
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.poll_interval = poll_interval
+        self.registry = registry or default_registry
+
+    def request_line(self, custom_id, prompt):
+        """Return the batch file record of one prompt."""
+        if self.provider == "GPT":
+            return {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": gpt_messages(prompt),
+                    "max_tokens": self.max_tokens,
+                    "temperature": self.temperature
+                }
+            }
+        return {
+            "custom_id": custom_id,
+            "params": {
+                "model": self.model,
+                "max_tokens": self.max_tokens,
+                "temperature": self.temperature,
+                "system": COBOL_SYSTEM_PROMPT,
+                "messages": claude_messages(prompt)
+            }
+        }
+
+    def fingerprint(self, requests):
+        """Digest of the request lines of a batch, in order."""
+        digest = hashlib.sha256()
+        for custom_id, prompt in requests:
+            digest.update(json.dumps(self.request_line(custom_id, prompt), sort_keys=True).encode("utf-8"))
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def write_batch_file(self, requests, path):
+        """
+        Write the requests as a JSONL batch file.
+        Args:
+            requests (list): (custom_id, prompt) pairs.
+            path (str): Path of the batch file.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            for custom_id, prompt in requests:
+                f.write(json.dumps(self.request_line(custom_id, prompt)) + "\n")
+
+    def submit(self, path):
+        """
+        Submit a batch file.
+        Returns:
+            str: The id of the batch job.
+        """
+        client = self.registry.client(self.model)
+        if self.provider == "GPT":
+            with open(path, "rb") as f:
+                batch_file = client.files.create(file=f, purpose="batch")
+            batch = client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/chat/completions",
+                completion_window="24h"
+            )
+        else:
+            with open(path, "r") as f:
+                requests = [json.loads(line) for line in f if line.strip()]
+            batch = client.messages.batches.create(requests=requests)
+        logger.info(f"Submitted batch {batch.id} with {self.model}")
+        return batch.id
+
+    def wait(self, batch_id):
+        """
+        Poll a batch until the provider has finished processing it.
+        Returns:
+            The final batch object.
+        """
+        client = self.registry.client(self.model)
+        while True:
+            if self.provider == "GPT":
+                batch = client.batches.retrieve(batch_id)
+                counts = batch.request_counts
+                progress = f"{counts.completed + counts.failed}/{counts.total}" if counts else "?"
+                status, finished = batch.status, batch.status in GPT_FINAL_STATES
+            else:
+                batch = client.messages.batches.retrieve(batch_id)
+                counts = batch.request_counts
+                progress = f"{counts.processing} processing"
+                status, finished = batch.processing_status, batch.processing_status == "ended"
+            logger.info(f"Batch {batch_id}: {status} ({progress})")
+            if finished:
+                return batch
+            time.sleep(self.poll_interval)
+
+    def results(self, batch):
+        """
+        Read the responses of a finished batch.
+        Returns:
+            dict: Response text by custom id; failed requests are missing.
+        """
+        client = self.registry.client(self.model)
+        results = {}
+        if self.provider == "GPT":
+            if batch.error_file_id:
+                for line in client.files.content(batch.error_file_id).text.splitlines():
+                    if line.strip():
+                        record = json.loads(line)
+                        logger.error(f"Batch request {record['custom_id']} failed: {record.get('error')}")
+            if not batch.output_file_id:
+                return results
+            for line in client.files.content(batch.output_file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if response.get("status_code") != 200:
+                    logger.error(f"Batch request {record['custom_id']} failed: {record.get('error') or response}")
+                    continue
+                results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        else:
+            for entry in client.messages.batches.results(batch.id):
+                if entry.result.type != "succeeded":
+                    logger.error(f"Batch request {entry.custom_id} {entry.result.type}")
+                    continue
+                results[entry.custom_id] = entry.result.message.content[0].text
+        return results
+
+    def run(self, requests, path):
+        """
+        Generate responses for all requests with one batch job.
+        Args:
+            requests (list): (custom_id, prompt) pairs, see custom_id().
+            path (str): Path of the batch file; the state file is written next to it.
+        Returns:
+            dict: Response text by custom id; requests that failed are missing.
+        """
+        state_path = f"{os.path.splitext(path)[0]}.state.json"
+        fingerprint = self.fingerprint(requests)
+        batch_id = None
+        if os.path.exists(state_path):
+            with open(state_path, "r") as f:
+                state = json.load(f)
+            if state.get("model") == self.model and state.get("fingerprint") == fingerprint:
+                batch_id = state["batch_id"]
+                logger.info(f"Attaching to batch {batch_id} submitted by an earlier run")
+            else:
+                logger.warning(f"Ignoring batch {state.get('batch_id')} of an earlier run, it was "
+                               f"submitted for different requests")
+
+        started = time.monotonic()
+        if batch_id is None:
+            self.write_batch_file(requests, path)
+            batch_id = self.submit(path)
+            with open(state_path, "w") as f:
+                json.dump({"model": self.model, "batch_id": batch_id, "fingerprint": fingerprint}, f)
+
+        batch = self.wait(batch_id)
+        results = self.results(batch)
+        logger.info(f"Batch {batch_id} returned {len(results)}/{len(requests)} responses "
+                    f"in {time.monotonic() - started:.1f}s")
+        # The batch is consumed; a later run submits a new one
+        os.remove(state_path)
+        return results
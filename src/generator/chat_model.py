@@ -1,189 +1,229 @@
 import requests
 from loguru import logger
-from openai import AzureOpenAI
 import json
-import anthropic
-import google.generativeai as genai  # New import for Gemini
-from dotenv import load_dotenv
+from .providers import ProviderRegistry, provider_for, registry as default_registry
+
+GPT_SYSTEM_PROMPT = "You are an AI assistant that generates cobol code and return clean code block. Output should consist of a single markdown code block following on from the lines above until the end of the program. It should terminate with `GOBACK`"
+COBOL_SYSTEM_PROMPT = "You are an AI assistant that generates GNU cobol code and return clean single markdown block."
+GEMINI_HISTORY = [
+    {
+        "role": "user",
+        "parts": [COBOL_SYSTEM_PROMPT]
+    },
+    {
+        "role": "model",
+        "parts": ["I understand. I'll generate GNU COBOL code in a clean, single markdown code block format when you provide a request."]
+    }
+]
+
+
+def system_prompt_for(model):
+    """Return the system instructions sent with every prompt to a model's provider."""
+    return GPT_SYSTEM_PROMPT if provider_for(model) == "GPT" else COBOL_SYSTEM_PROMPT
+
+
+def gpt_messages(prompt):
+    return [
+        {
+            "role": "system",
+            "content": [
+                {
+                    "type": "text",
+                    "text": GPT_SYSTEM_PROMPT
+                }
+            ]
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": prompt
+                }
+            ]
+        }
+    ]
+
+
+def claude_messages(query):
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": query
+                }
+            ]
+        }
+    ]
+
+
 class ChatModelsGenerator:
     """
     A class that provides access to different chat models including GPT-4o, GPT-3.5, and Claude models.
     """
-    
-    def __init__(self):
-        """Initialize the ChatModels class with proxy settings"""
+
+    def __init__(self, registry: ProviderRegistry = None):
+        """Initialize the ChatModels class with the registry holding the provider clients"""
         # self.proxies = {}
-    
-    def gemini(self, prompt, configs):
+        self.registry = registry or default_registry
+
+    def gemini_chat(self, configs, temperature=0.3, max_tokens=4096):
+        """Start a Gemini chat session primed with the COBOL system instructions."""
+        model_instance = self.registry.gemini_model(configs["model"], temperature, max_tokens)
+        # Set system instructions
+        return model_instance.start_chat(history=GEMINI_HISTORY)
+
+    def gemini(self, prompt, configs, max_tokens=4096, temperature=0.3):
         """
         Queries a Gemini model with the given prompt.
-        
+
         Args:
             prompt (str): The input prompt for the model
             configs (dict): Configuration containing API_KEY and model
-            
+
         Returns:
             str: The generated response content
         """
         try:
-            api_key = configs["API_KEY"]
-            model = configs["model"]
-            
-            # Configure the Gemini API
-            genai.configure(api_key=api_key)
-            
-            # Set up the model
-            generation_config = {
-                "temperature": 0.3,
-                "max_output_tokens": 4096,
-            }
-            
-            # Initialize the model
-            model_instance = genai.GenerativeModel(
-                model_name=model,
-                generation_config=generation_config
-            )
-            
-            # Set system instructions
-            chat = model_instance.start_chat(
-                history=[
-                    {
-                        "role": "user",
-                        "parts": ["You are an AI assistant that generates GNU cobol code and return clean single markdown block."]
-                    },
-                    {
-                        "role": "model",
-                        "parts": ["I understand. I'll generate GNU COBOL code in a clean, single markdown code block format when you provide a request."]
-                    }
-                ]
-            )
-            
+            chat = self.gemini_chat(configs, temperature, max_tokens)
+
             # Generate the response
             response = chat.send_message(prompt)
             return response.text
-            
+
         except Exception as e:
             raise SystemExit(f"Failed to make the request to Gemini. Error: {e}")
 
-    def gpt(self, prompt, configs):
+    def gpt(self, prompt, configs, max_tokens=4096, temperature=0.3):
         """
         Queries the GPT-3.5 model with the given prompt.
-        
+
         Args:
             prompt (str): The input prompt for the model
             configs (dict): Configuration containing API_KEY, ENDPOINT, and model
-            
+
         Returns:
             str: The generated response content
         """
-        API_KEY = configs["API_KEY"]
-        ENDPOINT = configs["ENDPOINT"]
-        API_VERSION = configs["api_version"]
         deployment = configs["model"]
-
-        client = AzureOpenAI(  
-            azure_endpoint=ENDPOINT,  
-            api_key=API_KEY,  
-            api_version=API_VERSION, 
-        )
-        messages= [
-            {
-                "role": "system",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "You are an AI assistant that generates cobol code and return clean code block. Output should consist of a single markdown code block following on from the lines above until the end of the program. It should terminate with `GOBACK`"
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt
-                    }
-                ]
-            }
-        ]
+        client = self.registry.client(deployment)
 
         try:
-            completion = client.chat.completions.create(  
-                model=deployment,  
-                messages=messages,  
-                max_tokens=4096,  
-                temperature=0.3,  
-                stop=None,  
+            completion = client.chat.completions.create(
+                model=deployment,
+                messages=gpt_messages(prompt),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stop=None,
                 stream=False
             )
         except requests.RequestException as e:
             raise SystemExit(f"Failed to make the request. Error: {e}")
 
-        result = completion.to_json()  
+        result = completion.to_json()
         result_json = json.loads(result)
         return result_json['choices'][0]['message']['content']
-    
-    def claude(self, query, configs, tokens=4096):
+
+    def claude(self, query, configs, tokens=4096, temperature=0.3):
         """
         Queries a Claude model with the given prompt.
-        
+
         Args:
             query (str): The input prompt for the model
             configs (dict): Configuration containing API_KEY and model
             tokens (int): Maximum number of tokens to generate
-            
+
         Returns:
             str: The generated response content
         """
         try:
-            api_key = configs["API_KEY"]
             model = configs["model"]
-            client = anthropic.Anthropic(api_key=api_key)
+            client = self.registry.client(model)
             response = client.messages.create(
                 model=model,
                 max_tokens=tokens,
-                temperature=0.3,
-                system="You are an AI assistant that generates GNU cobol code and return clean single markdown block.",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": query
-                            }
-                        ]
-                    }
-                ]
+                temperature=temperature,
+                system=COBOL_SYSTEM_PROMPT,
+                messages=claude_messages(query)
             ).content[0].text
         except requests.RequestException as e:
             raise SystemExit(f"Failed to make the request. Error: {e}")
-        
+
         return response
-    
-    
-    def chat(self, prompt, model):
+
+
+    def chat(self, prompt, model, max_tokens=4096, temperature=0.3):
         """
         Generic method to query any supported model.
-        
+
         Args:
             prompt (str): The input prompt for the model
             model (str): The model to use (gpt-4o, gpt-35, claude-sonnet, claude-opus)
-            
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature
+
+        Returns:
+            str: The generated response content
+        """
+        provider = provider_for(model)
+        api_configs = self.registry.config(model)
+        if provider == "GPT":
+            return self.gpt(prompt, api_configs, max_tokens, temperature)
+        elif provider == "CLAUDE":
+            return self.claude(prompt, api_configs, max_tokens, temperature)
+        else:
+            return self.gemini(prompt, api_configs, max_tokens, temperature)
+
+    async def agpt(self, prompt, configs, max_tokens=4096, temperature=0.3):
+        """Async version of gpt(); errors are raised to the caller instead of exiting."""
+        client = self.registry.async_client(configs["model"])
+        completion = await client.chat.completions.create(
+            model=configs["model"],
+            messages=gpt_messages(prompt),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=False
+        )
+        return completion.choices[0].message.content
+
+    async def aclaude(self, query, configs, max_tokens=4096, temperature=0.3):
+        """Async version of claude(); errors are raised to the caller instead of exiting."""
+        client = self.registry.async_client(configs["model"])
+        response = await client.messages.create(
+            model=configs["model"],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=COBOL_SYSTEM_PROMPT,
+            messages=claude_messages(query)
+        )
+        return response.content[0].text
+
+    async def agemini(self, prompt, configs, max_tokens=4096, temperature=0.3):
+        """Async version of gemini(); errors are raised to the caller instead of exiting."""
+        chat = self.gemini_chat(configs, temperature, max_tokens)
+        response = await chat.send_message_async(prompt)
+        return response.text
+
+    async def achat(self, prompt, model, max_tokens=4096, temperature=0.3):
+        """
+        Async version of chat(), used by the concurrent generation engine.
+
+        Args:
+            prompt (str): The input prompt for the model
+            model (str): The model to use (gpt-4o, gpt-35, claude-sonnet, claude-opus, gemini-pro)
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature
+
         Returns:
             str: The generated response content
         """
-        api_config = load_dotenv(".env")
-        if "gpt" in model:
-            api_configs = {"API_KEY":api_config["GPT"]["API_KEY"], "model": model}                
-            return self.gpt(prompt, api_configs)
-        
-        elif "claude" in model:
-            api_configs = {"API_KEY": api_config["CLAUDE"]["API_KEY"], "model": model}
-            return self.claude(prompt, api_configs)
-        elif "gemini" in model:
-            api_configs = {"API_KEY": api_config["GEMINI"]["API_KEY"], "model": model}
-            return self.gemini(prompt, api_configs)
-            
+        provider = provider_for(model)
+        api_configs = self.registry.config(model)
+        if provider == "GPT":
+            return await self.agpt(prompt, api_configs, max_tokens, temperature)
+        elif provider == "CLAUDE":
+            return await self.aclaude(prompt, api_configs, max_tokens, temperature)
         else:
-            raise ValueError("Please select correct model from available models. \n1. gpt-4o\n2. gpt-35\n3. claude-sonnet\n4. claude-opus\n5. gemini-pro")
\ No newline at end of file
+            return await self.agemini(prompt, api_configs, max_tokens, temperature)
@@ -0,0 +1,153 @@
+import time
+from collections import Counter
+from loguru import logger
+from transformers import StoppingCriteriaList
+from .hf_stopping import CobolStoppingCriteria
+
+# Default number of tokens (prompt plus generated, padding included) in one generate() batch
+BATCH_TOKENS = 32768
+
+
+def prompt_budgets(lengths, max_length, max_new_tokens=None):
+    """
+    Maximum new tokens of every prompt: what is left of max_length after the prompt,
+    capped at max_new_tokens.
+    """
+    budgets = [max(1, max_length - length) for length in lengths]
+    if max_new_tokens:
+        budgets = [min(budget, max_new_tokens) for budget in budgets]
+    return budgets
+
+
+def length_buckets(lengths, max_length, batch_tokens=BATCH_TOKENS, max_batch_size=None, sequences=1,
+                   max_new_tokens=None):
+    """
+    Group prompts of similar token length into batches that fit a token budget.
+    Prompts are sorted by length so a batch wastes little on padding. Every row of a
+    batch is padded to its longest prompt and then generates up to the largest budget
+    in the batch, so a batch of n prompts costs n * sequences * that many tokens.
+    Args:
+        lengths (list): Token length of every prompt.
+        max_length (int): Maximum length of a generated sequence, prompt included.
+        batch_tokens (int): Token budget of a batch.
+        max_batch_size (int): Maximum prompts per batch, unbounded if None.
+        sequences (int): Sequences generated per prompt.
+        max_new_tokens (int): Cap on the tokens generated per sequence.
+    Returns:
+        list: Batches of prompt indices; every prompt appears in exactly one batch.
+    """
+    budgets = prompt_budgets(lengths, max_length, max_new_tokens)
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    batch = []
+    for i in order:
+        candidate = batch + [i]
+        width = max(lengths[j] for j in candidate) + max(budgets[j] for j in candidate)
+        too_many = max_batch_size and len(candidate) > max_batch_size
+        if batch and (too_many or len(candidate) * sequences * width > batch_tokens):
+            batches.append(batch)
+            candidate = [i]
+        batch = candidate
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def sampling_kwargs(temperature):
+    """generate() arguments for a temperature: greedy decoding at 0, sampling above."""
+    return {"do_sample": True, "temperature": temperature} if temperature else {}
+
+
+def batched_generate(prompts, model, tokenizer, max_length=8000, batch_tokens=BATCH_TOKENS,
+                     max_batch_size=None, on_batch=None, num_return_sequences=1, mode=None,
+                     max_new_tokens=None, **generate_kwargs):
+    """
+    Generate text for many prompts with length-bucketed, left-padded batches.
+    Like the single-prompt helpers, each result is the decoded full sequence
+    (prompt and completion) without special tokens.
+
+    With num_return_sequences > 1 every prompt is prefilled once and expanded into
+    that many sequences. Greedy decoding would return the same sequence each time,
+    so without do_sample it is generated once and repeated.
+
+    With `mode`, every sequence stops as soon as its COBOL program is complete (see
+    CobolStoppingCriteria) and after its own budget of new tokens: what max_length
+    leaves after its prompt, capped at max_new_tokens.
+    Args:
+        prompts (list): The input prompts.
+        model: The Hugging Face model to use for generation.
+        tokenizer: The tokenizer for the model.
+        max_length (int): Maximum length of the generated text, prompt included.
+        batch_tokens (int): Token budget of one generate() call.
+        max_batch_size (int): Maximum prompts per generate() call.
+        on_batch (callable): Called with (prompt indices, texts per prompt) as each batch finishes.
+        num_return_sequences (int): Sequences to generate per prompt.
+        mode (str): "Instruct" or "Complete" to stop at the end of the program, None to
+            only stop on EOS and length.
+        max_new_tokens (int): Cap on the tokens generated per sequence.
+        **generate_kwargs: Extra arguments for model.generate().
+    Returns:
+        list: For every prompt, in the order of `prompts`, the list of its generated texts.
+    """
+    import torch
+
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    # Decoder-only models continue from the last position, so padding goes on the left
+    tokenizer.padding_side = "left"
+
+    sampled = num_return_sequences if generate_kwargs.get("do_sample") else 1
+    if sampled > 1:
+        generate_kwargs["num_return_sequences"] = sampled
+
+    encoded = [tokenizer(prompt)["input_ids"] for prompt in prompts]
+    lengths = [len(ids) for ids in encoded]
+    budgets = prompt_budgets(lengths, max_length, max_new_tokens)
+    batches = length_buckets(lengths, max_length, batch_tokens, max_batch_size, sampled, max_new_tokens)
+    results = [None] * len(prompts)
+    stopped = Counter()
+    generated_tokens = 0
+    generation_time = 0.0
+    for number, batch in enumerate(batches, 1):
+        inputs = tokenizer.pad({"input_ids": [encoded[i] for i in batch]}, return_tensors="pt").to(model.device)
+        prompt_length = inputs["input_ids"].shape[1]
+        batch_kwargs = dict(generate_kwargs)
+        if mode:
+            # Rows are the prompts of the batch, each repeated once per returned sequence
+            row_budgets = [budgets[i] for i in batch for _ in range(sampled)]
+            criteria = CobolStoppingCriteria(tokenizer, prompt_length, mode, row_budgets)
+            batch_kwargs["stopping_criteria"] = StoppingCriteriaList([criteria])
+        started = time.monotonic()
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=max(budgets[i] for i in batch),
+                eos_token_id=tokenizer.eos_token_id,
+                pad_token_id=tokenizer.pad_token_id,
+                **batch_kwargs
+            )
+        elapsed = time.monotonic() - started
+        # Rows that stopped early are padded up to the longest one
+        new_tokens = int((outputs[:, prompt_length:] != tokenizer.pad_token_id).sum())
+        generated_tokens += new_tokens
+        generation_time += elapsed
+        if mode:
+            stopped.update(criteria.reasons.values())
+        texts = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        # generate() returns the sequences of each prompt next to each other
+        grouped = [texts[row * sampled:(row + 1) * sampled] for row in range(len(batch))]
+        if sampled < num_return_sequences:
+            grouped = [sequences * num_return_sequences for sequences in grouped]
+        for i, sequences in zip(batch, grouped):
+            results[i] = sequences
+        if on_batch:
+            on_batch(batch, grouped)
+        logger.info(f"Generated batch {number}/{len(batches)} ({len(batch)} prompts of {prompt_length} tokens, "
+                    f"{outputs.shape[1] - prompt_length} new) in {elapsed:.1f}s, "
+                    f"{new_tokens / max(elapsed, 1e-9):.1f} tokens/s")
+    if mode:
+        logger.info(f"Stopping reasons: {dict(stopped)}")
+    if generation_time:
+        logger.info(f"Generated {generated_tokens} tokens in {generation_time:.1f}s "
+                    f"({generated_tokens / generation_time:.1f} tokens/s)")
+    return results
@@ -0,0 +1,63 @@
+import time
+from loguru import logger
+from src.utils.models import CPUInferenceOptions
+
+
+def configure_threads(threads=0, interop_threads=0):
+    """
+    Set the torch intra-op and inter-op thread pools; 0 keeps the torch default.
+    The inter-op pool can only be sized before torch runs any parallel work.
+    """
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            logger.warning(f"Could not set the inter-op threads: {e}")
+    logger.info(f"torch uses {torch.get_num_threads()} threads and {torch.get_num_interop_threads()} inter-op threads")
+
+
+def load_cpu_model(name, options: CPUInferenceOptions = None):
+    """
+    Load a causal language model for CPU inference.
+    Weights are loaded in float32, since most CPUs have no fast bfloat16 kernels, and
+    are memory-mapped from safetensors when available instead of being copied into a
+    freshly allocated model first.
+    Args:
+        name (str): Model name or path.
+        options (CPUInferenceOptions): Quantization, threading and compilation settings.
+    Returns:
+        The model, in eval mode.
+    """
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    options = options or CPUInferenceOptions()
+    configure_threads(options.threads, options.interop_threads)
+
+    started = time.monotonic()
+    model = AutoModelForCausalLM.from_pretrained(name, torch_dtype=torch.float32, low_cpu_mem_usage=True)
+    model.eval()
+    logger.info(f"Loaded {name} on CPU in {time.monotonic() - started:.1f}s")
+
+    if options.quantize:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        quantized = sum(1 for module in model.modules() if type(module).__name__ == "Linear"
+                        and type(module).__module__.startswith("torch.ao.nn.quantized"))
+        if quantized:
+            logger.info(f"Quantized {quantized} Linear layers to int8")
+        else:
+            logger.warning(f"{name} has no torch.nn.Linear layers to quantize")
+    if options.compile:
+        # Prompt and sequence lengths change at every step, so the graph is compiled
+        # for dynamic shapes; the first batch pays for compilation
+        model.forward = torch.compile(model.forward, dynamic=True)
+    return model
+
+
+def cache_method(method, options: CPUInferenceOptions = None):
+    """Response cache method name of an HF generator; int8 models answer differently, so they get their own."""
+    return f"{method}-int8" if options and options.quantize else method
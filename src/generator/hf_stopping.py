@@ -0,0 +1,118 @@
+import re
+from transformers import StoppingCriteria
+from src.utils.cobol_preflight import INDICATORS
+
+END_PROGRAM = re.compile(r"^\s*END\s+PROGRAM\b", re.IGNORECASE)
+TERMINAL_STATEMENT = re.compile(r"\b(GOBACK|STOP\s+RUN)\s*\.", re.IGNORECASE)
+# A block of up to MAX_PERIOD lines repeated this many times in a row is a loop;
+# single lines need more repeats since COBOL legitimately repeats short lines
+MAX_PERIOD = 8
+LINE_REPEATS = 10
+BLOCK_REPEATS = 5
+
+
+def is_fixed_format(line):
+    """
+    Whether a line looks like fixed-format COBOL: sequence area, then a valid indicator.
+    Lines that end within the sequence area are ignored by cobc and count as fixed format.
+    """
+    if len(line) <= 6:
+        return True
+    return (not line[:6].strip() or line[:6].isdigit()) and line[6] in INDICATORS
+
+
+def repeating(lines):
+    """Whether the last lines are one block of up to MAX_PERIOD lines repeated over and over."""
+    for period in range(1, MAX_PERIOD + 1):
+        repeats = LINE_REPEATS if period == 1 else BLOCK_REPEATS
+        window = period * repeats
+        if len(lines) < window:
+            break
+        tail = lines[-window:]
+        if all(tail[i] == tail[i % period] for i in range(period, window)):
+            return True
+    return False
+
+
+def program_finished(text, mode):
+    """
+    Decide whether generated text already holds a whole program.
+    Only complete lines are considered, so a statement being generated is never cut.
+    Args:
+        text (str): The generated text, without the prompt.
+        mode (str): "Instruct" or "Complete".
+    Returns:
+        str: Why generation can stop ("end_program", "closing_fence", "after_terminal"
+        or "repetition"), or None to continue.
+    """
+    # cobc expands tabs to multiples of 8 columns
+    lines = text.expandtabs(8).split("\n")[:-1]
+    fences = 0
+    terminated = False
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if END_PROGRAM.match(line[7:] if is_fixed_format(line) else line):
+            return "end_program"
+        if stripped.startswith("```"):
+            fences += 1
+            # The opening fence comes first; a fence after a terminal statement closes the block too
+            if mode == "Instruct" and (fences >= 2 or terminated):
+                return "closing_fence"
+            continue
+        if terminated and not is_fixed_format(line):
+            return "after_terminal"
+        if TERMINAL_STATEMENT.search(line):
+            terminated = True
+    if repeating([line.rstrip() for line in lines if line.strip()]):
+        return "repetition"
+    return None
+
+
+class CobolStoppingCriteria(StoppingCriteria):
+    """
+    Stops each generated sequence as soon as its COBOL program is complete.
+
+    Sequences stop on END PROGRAM, on the closing markdown fence in Instruct mode,
+    on prose after GOBACK/STOP RUN, on a repetition loop, or when they reach their
+    own token budget. The generated text is checked every `check_every` tokens,
+    which keeps decoding overhead small at the cost of a few extra tokens that
+    post-processing removes anyway.
+    """
+
+    def __init__(self, tokenizer, prompt_length, mode, budgets=None, check_every=4):
+        """
+        Args:
+            tokenizer: The tokenizer for the model.
+            prompt_length (int): Width of the (left-padded) prompt in input_ids.
+            mode (str): "Instruct" or "Complete".
+            budgets (list): Maximum new tokens of every sequence, unbounded if None.
+            check_every (int): Generated tokens between two checks of a sequence.
+        """
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.mode = mode
+        self.budgets = budgets
+        self.check_every = check_every
+        self.reasons = {}
+
+    def __call__(self, input_ids, scores, **kwargs):
+        import torch
+
+        steps = input_ids.shape[1] - self.prompt_length
+        done = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        for row in range(input_ids.shape[0]):
+            if row in self.reasons:
+                done[row] = True
+                continue
+            reason = None
+            if self.budgets is not None and steps >= self.budgets[row]:
+                reason = "budget"
+            elif steps % self.check_every == 0:
+                text = self.tokenizer.decode(input_ids[row, self.prompt_length:], skip_special_tokens=True)
+                reason = program_finished(text, self.mode)
+            if reason:
+                self.reasons[row] = reason
+                done[row] = True
+        return done
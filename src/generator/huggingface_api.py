@@ -1,6 +1,7 @@
 from loguru import logger
 from . import LLMGenerator
 from src.utils import extract_code_block, Model
+from .response_cache import ResponseCache
 from transformers import AutoTokenizer, AutoModelForCausalLM
 
 def huggingface_api_inference(prompt, model, tokenizer, max_length=8000, eos_token=None):
@@ -23,9 +24,10 @@ class HuggingfaceAPIInferenceGenerator(LLMGenerator):
     """
     Completes WORKING-STORAGE then PROCEDURE DIVISION with Hugging Face's API.
     """
+    method = "hf-api"
 
-    def __init__(self, model: Model, prompt_type):
-        super().__init__(model, prompt_type)
+    def __init__(self, model: Model, prompt_type, cache: ResponseCache = None, resume=False):
+        super().__init__(model, prompt_type, cache=cache, resume=resume)
         self.hf_model = model
         self.hf_tokenizer = model.tokenizer
         self.prompt_type = prompt_type
@@ -36,7 +38,10 @@ class HuggingfaceAPIInferenceGenerator(LLMGenerator):
 
     def solve(self, eval, sample_id=0):
         logger.info(f"Generating {eval['Program_name']}")
-        sol = huggingface_api_inference(eval["Cobol_Eval"], self.hf_model, self.hf_tokenizer, 8000, eos_token=self.hf_tokenizer.eos_token)
+        sol = self.cached_response(
+            self.cache_key(eval["Cobol_Eval"], sample_id, temperature=self.model.temp, max_tokens=8000),
+            lambda: huggingface_api_inference(eval["Cobol_Eval"], self.hf_model, self.hf_tokenizer, 8000, eos_token=self.hf_tokenizer.eos_token)
+        )
         if self.prompt_type == "Complete":
             program = self.construct(eval["Cobol_Eval"], sol)
         else:
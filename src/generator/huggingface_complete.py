@@ -2,6 +2,10 @@ from transformers import AutoModelForCausalLM, AutoTokenizer
 from loguru import logger
 from src.utils import Model
 from . import LLMGenerator
+from .response_cache import ResponseCache
+from src.utils.models import CPUInferenceOptions
+from .hf_batching import batched_generate, sampling_kwargs, BATCH_TOKENS
+from .hf_cpu import load_cpu_model, cache_method
 
 def hf_complete(prompt, model, tokenizer, max_length=8000, eos_token=None):
     """
@@ -20,10 +24,19 @@ def hf_complete(prompt, model, tokenizer, max_length=8000, eos_token=None):
     return tokenizer.decode(outputs[0], skip_special_tokens=True)
 class HuggingfaceComplete(LLMGenerator):
     """Completes WORKING-STORAGE then PROCEDURE DIVISION with local Huggingface model"""
+    method = "hf-complete"
 
-    def __init__(self, model: Model, prompt_type):
-        super().__init__(model, prompt_type)
-        self.hf_model = AutoModelForCausalLM.from_pretrained(model.name, device_map="auto")
+    def __init__(self, model: Model, prompt_type, cache: ResponseCache = None, batch_tokens=BATCH_TOKENS,
+                 max_new_tokens=None, resume=False, cpu: CPUInferenceOptions = None):
+        super().__init__(model, prompt_type, cache=cache, resume=resume)
+        self.batch_tokens = batch_tokens
+        # Cap on generated tokens per sample; generation also stops at the end of the program
+        self.max_new_tokens = max_new_tokens
+        if cpu:
+            self.hf_model = load_cpu_model(model.name, cpu)
+            self.method = cache_method(self.method, cpu)
+        else:
+            self.hf_model = AutoModelForCausalLM.from_pretrained(model.name, device_map="auto")
         if model.tokenizer:
             self.hf_tokenizer = AutoTokenizer.from_pretrained(model.tokenizer)
         else:
@@ -36,7 +49,26 @@ class HuggingfaceComplete(LLMGenerator):
 
     def solve(self, eval, sample_id=0):
         logger.info(f"generating {eval['Program_name']}")
-        sol = hf_complete(eval["Cobol_Eval"], self.hf_model, self.hf_tokenizer, 8000, eos_token=self.model.eos_token)
+        sol = self.cached_response(
+            self.cache_key(eval["Cobol_Eval"], sample_id, temperature=self.model.temp, max_tokens=8000),
+            lambda: hf_complete(eval["Cobol_Eval"], self.hf_model, self.hf_tokenizer, 8000, eos_token=self.model.eos_token)
+        )
         logger.info(sol)
-        program = self.combine_prompt_and_solution(eval['Cobol_Eval'], sol)
-        return program
\ No newline at end of file
+        return self.postprocess(eval['Cobol_Eval'], sol)
+
+    def postprocess(self, prompt, sol):
+        """Combine the prompt and the model's completion into the program."""
+        return self.combine_prompt_and_solution(prompt, sol)
+
+    def run_jobs(self, jobs):
+        """Generate all samples in length-bucketed batches, prefilling each prompt once for all its samples."""
+        self.run_batched(
+            jobs,
+            lambda prompts, on_batch, samples: batched_generate(
+                prompts, self.hf_model, self.hf_tokenizer, 8000, self.batch_tokens, on_batch=on_batch,
+                num_return_sequences=samples, mode=self.prompt_type, max_new_tokens=self.max_new_tokens,
+                **sampling_kwargs(self.model.temp)
+            ),
+            temperature=self.model.temp,
+            max_tokens=[8000, self.max_new_tokens]
+        )
\ No newline at end of file
@@ -1,6 +1,10 @@
 from loguru import logger
 from . import LLMGenerator
 from src.utils import extract_code_block, Model
+from .response_cache import ResponseCache
+from src.utils.models import CPUInferenceOptions
+from .hf_batching import batched_generate, sampling_kwargs, BATCH_TOKENS
+from .hf_cpu import load_cpu_model, cache_method
 
 def hf_instruct(prompt, model, tokenizer, max_length=8000, eos_token=None):
     """
@@ -21,12 +25,21 @@ class HuggingfaceInstruct(LLMGenerator):
     """
     Completes WORKING-STORAGE then PROCEDURE DIVISION with local Huggingface model
     """
+    method = "hf-instruct"
 
-    def __init__(self, model: Model, prompt_type):
+    def __init__(self, model: Model, prompt_type, cache: ResponseCache = None, batch_tokens=BATCH_TOKENS,
+                 max_new_tokens=None, resume=False, cpu: CPUInferenceOptions = None):
         from transformers import AutoModelForCausalLM, AutoTokenizer
         import torch
-        super().__init__(model, prompt_type)
-        self.hf_model = AutoModelForCausalLM.from_pretrained(model.name, device_map="auto", torch_dtype=torch.bfloat16)
+        super().__init__(model, prompt_type, cache=cache, resume=resume)
+        self.batch_tokens = batch_tokens
+        # Cap on generated tokens per sample; generation also stops at the end of the program
+        self.max_new_tokens = max_new_tokens
+        if cpu:
+            self.hf_model = load_cpu_model(model.name, cpu)
+            self.method = cache_method(self.method, cpu)
+        else:
+            self.hf_model = AutoModelForCausalLM.from_pretrained(model.name, device_map="auto", torch_dtype=torch.bfloat16)
         if model.tokenizer:
             self.hf_tokenizer = AutoTokenizer.from_pretrained(model.tokenizer)
         else:
@@ -34,7 +47,26 @@ class HuggingfaceInstruct(LLMGenerator):
 
     def solve(self, eval, sample_id=0):
         logger.info(f"generating {eval['Program_name']}")
-        sol = hf_instruct(eval["Cobol_Eval"], self.hf_model, self.hf_tokenizer, 8000, eos_token=self.hf_tokenizer.eos_token)
+        sol = self.cached_response(
+            self.cache_key(eval["Cobol_Eval"], sample_id, temperature=self.model.temp, max_tokens=8000),
+            lambda: hf_instruct(eval["Cobol_Eval"], self.hf_model, self.hf_tokenizer, 8000, eos_token=self.hf_tokenizer.eos_token)
+        )
         logger.info(sol)
-        program = extract_code_block(sol)
-        return program
\ No newline at end of file
+        return self.postprocess(eval["Cobol_Eval"], sol)
+
+    def postprocess(self, prompt, sol):
+        """Extract the program from the model's answer."""
+        return extract_code_block(sol)
+
+    def run_jobs(self, jobs):
+        """Generate all samples in length-bucketed batches, prefilling each prompt once for all its samples."""
+        self.run_batched(
+            jobs,
+            lambda prompts, on_batch, samples: batched_generate(
+                prompts, self.hf_model, self.hf_tokenizer, 8000, self.batch_tokens, on_batch=on_batch,
+                num_return_sequences=samples, mode=self.prompt_type, max_new_tokens=self.max_new_tokens,
+                **sampling_kwargs(self.model.temp)
+            ),
+            temperature=self.model.temp,
+            max_tokens=[8000, self.max_new_tokens]
+        )
\ No newline at end of file
@@ -1,21 +1,190 @@
+import os
 import json
+from loguru import logger
+from src.data import TaskStore
+from src.utils import json_to_csv
+from src.utils.checkpoint import CheckpointLog
+from src.utils.disk_cache import atomic_open
+from src.utils.models import GenerationOptions
+from .response_cache import ResponseCache, ResponseCacheMiss
+
 class LLMGenerator:
-    def __init__(self, model, prompt_type):
+    # Generation method name, part of the response cache key
+    method = None
+
+    def __init__(self, model, prompt_type, options: GenerationOptions = None, cache: ResponseCache = None,
+                 resume=False):
         self.model = model
         self.prompt_type = prompt_type
-        self.output_path = None
+        self.options = options or GenerationOptions()
+        self.cache = cache
+        # With resume, samples already in the sample log are not generated again
+        self.resume = resume
+        self.output_path = "preds"
         self.solutions_path = None
         self.errors_path = None
-        self.samples = []
+        self.sample_log = None
+
+    def jobs(self):
+        """Return the (task record, sample_id) pairs to generate, task by task."""
+        tasks = TaskStore.for_mode(self.prompt_type)
+        return [(task.to_dict(), sample_id) for task in tasks for sample_id in range(self.model.samples_per_task)]
+
+    @staticmethod
+    def sample_key(program_name, sample_id):
+        """Key of a sample in the sample log."""
+        return f"{program_name}:{sample_id}"
 
     def eval(self):
-        raise NotImplementedError("This method should be implemented by subclasses.")
+        """
+        Generate every sample of every benchmark task and save them as
+        {output_path}/{model}_generated_results.csv.
+        Returns:
+            bool: True if the results were saved.
+        """
+        jobs = self.jobs()
+        os.makedirs(self.output_path, exist_ok=True)
+        # Every sample is durably appended to the log as soon as it is generated, so an
+        # interrupted run loses at most the samples in flight
+        self.sample_log = CheckpointLog(
+            os.path.join(self.output_path, f"{self.model.name}_{self.prompt_type.lower()}_samples.jsonl"))
+        if self.resume:
+            done = self.sample_log.load()
+            pending = [(eval, sample_id) for eval, sample_id in jobs
+                       if self.sample_key(eval["Program_name"], sample_id) not in done]
+            logger.info(f"Resuming from {self.sample_log.path}: {len(jobs) - len(pending)} samples already generated")
+        else:
+            self.sample_log.reset()
+            pending = jobs
+
+        logger.info(f"Generating {len(pending)} samples with {self.model.name}")
+        if self.cache and self.cache.replay:
+            logger.info("Replaying responses from the response cache")
+        try:
+            if pending:
+                self.run_jobs(pending)
+        finally:
+            self.sample_log.close()
+
+        if self.cache:
+            stats = self.cache.stats()
+            logger.info(f"Response cache hits: {stats['hits']} \nResponse cache misses: {stats['misses']}")
+        return self.save_samples(jobs) is not None
+
+    def run_jobs(self, jobs):
+        """Generate the given (task record, sample_id) pairs one at a time."""
+        for eval, sample_id in jobs:
+            try:
+                program = self.solve(eval, sample_id)
+            except ResponseCacheMiss:
+                raise
+            except Exception as e:
+                logger.error(f"Generation failed for {eval['Program_name']} (sample {sample_id}): {e}")
+                program = ""
+            self.record(eval, sample_id, program)
+
+    def cache_key(self, prompt, sample_id, system_prompt="", temperature=None, max_tokens=None):
+        """Return the response cache key of a request, None when no cache is used."""
+        if not self.cache:
+            return None
+        return self.cache.key(self.method or type(self).__name__, self.model.name, self.prompt_type,
+                              system_prompt, prompt, temperature, max_tokens, sample_id)
+
+    def cached_response(self, key, generate):
+        """
+        Return the cached response for `key`, or call `generate()` and cache its result.
+        Args:
+            key (str): The key from cache_key(), None to always generate.
+            generate (callable): Produces the raw model response.
+        Returns:
+            str: The raw model response.
+        """
+        if key is None:
+            return generate()
+        response = self.cache.get(key)
+        if response is None:
+            response = generate()
+            self.cache.put(key, response)
+        return response
+
+    def run_batched(self, jobs, generate_batch, temperature=None, max_tokens=None):
+        """
+        Generate the jobs missing from the response cache in batches and record every sample.
+        All missing samples of a task are generated together from a single prompt, so the
+        prompt is only prefilled once per task; the n-th response goes to the task's n-th
+        missing sample_id.
+        Args:
+            jobs (list): (task record, sample_id) pairs.
+            generate_batch (callable): Called with the prompts to generate, an `on_batch`
+                callback receiving (prompt indices, responses per prompt) as each batch
+                finishes, and the number of responses wanted per prompt.
+            temperature (float): Sampling temperature, part of the cache key.
+            max_tokens (int): Generation length limit, part of the cache key.
+        """
+        pending = {}
+        for eval, sample_id in jobs:
+            key = self.cache_key(eval["Cobol_Eval"], sample_id, temperature=temperature, max_tokens=max_tokens)
+            cached = self.cache.get(key) if key else None
+            if cached is not None:
+                self.record(eval, sample_id, self.postprocess(eval["Cobol_Eval"], cached))
+            else:
+                pending.setdefault(eval["Program_name"], (eval, []))[1].append((sample_id, key))
+
+        # Tasks missing the same number of samples share generate() calls
+        groups = {}
+        for eval, samples in pending.values():
+            groups.setdefault(len(samples), []).append((eval, samples))
+
+        for count, tasks in groups.items():
+            def on_batch(indices, responses, tasks=tasks):
+                for index, sols in zip(indices, responses):
+                    eval, samples = tasks[index]
+                    for (sample_id, key), sol in zip(samples, sols):
+                        if key:
+                            self.cache.put(key, sol)
+                        self.record(eval, sample_id, self.postprocess(eval["Cobol_Eval"], sol))
+
+            generate_batch([eval["Cobol_Eval"] for eval, _ in tasks], on_batch, count)
+
+    def record(self, eval, sample_id, program):
+        """Durably append a finished sample to the sample log."""
+        sample = {
+            "Program_name": eval["Program_name"],
+            "sample_id": sample_id,
+            "Cobol_Eval": eval["Cobol_Eval"],
+            "Expected_Program": eval.get("Expected_Program", ""),
+            "Generated_program": program
+        }
+        self.sample_log.append({"key": self.sample_key(eval["Program_name"], sample_id), **sample})
 
     def solve(self, eval, sample_id=0):
         raise NotImplementedError("This method should be implemented by subclasses.")
 
-    def save_samples(self):
-        if self.output_path:
-            with open(f"{self.output_path}/samples.jsonl", "w+") as f:
-                for sample in self.samples:
-                    f.write(json.dumps(sample) + "\n")
\ No newline at end of file
+    def save_samples(self, jobs):
+        """
+        Compact the sample log into {output_path}/{model}_{mode}_generated_results.jsonl, in
+        task and sample order with one record per sample, and convert it to the CSV the
+        evaluator reads.
+        Args:
+            jobs (list): All (task record, sample_id) pairs of the run.
+        Returns:
+            str: Path of {output_path}/{model}_generated_results.csv, None if it could not be written.
+        """
+        records = self.sample_log.load()
+        missing = 0
+        # Named like the sample log so that runs of other models and modes keep theirs
+        samples_path = os.path.join(
+            self.output_path, f"{self.model.name}_{self.prompt_type.lower()}_generated_results.jsonl")
+        with atomic_open(samples_path) as f:
+            for eval, sample_id in jobs:
+                record = records.get(self.sample_key(eval["Program_name"], sample_id))
+                if record is None:
+                    missing += 1
+                    continue
+                record.pop("key")
+                f.write(json.dumps(record) + "\n")
+        if missing:
+            logger.warning(f"{missing} samples are missing from {self.sample_log.path}")
+
+        csv_path = os.path.join(self.output_path, f"{self.model.name}_generated_results.csv")
+        return json_to_csv(samples_path, csv_path)
@@ -1,11 +1,21 @@
+import os
 from loguru import logger
 from src.utils import extract_code_block,Model
+from src.utils.models import GenerationOptions
 from . import ChatModelsGenerator, LLMGenerator
+from .chat_model import system_prompt_for
+from .providers import provider_for
+from .async_engine import AsyncGenerationEngine
+from .batch_submit import BatchSubmitter, custom_id
+from .response_cache import ResponseCache
 class OpenAIChat(LLMGenerator):
-    def __init__(self, model: Model, prompt_type):
+    method = "chat-api"
+
+    def __init__(self, model: Model, prompt_type, options: GenerationOptions = None, cache: ResponseCache = None,
+                 resume=False):
         self.model_name = model.name
         self.prompt_type = prompt_type
-        super().__init__(model, prompt_type)
+        super().__init__(model, prompt_type, options, cache, resume)
 
     def construct(self, prompt: str, sol: str):
         if sol.strip().startswith("WORKING-STORAGE SECTION."):
@@ -13,14 +23,89 @@ class OpenAIChat(LLMGenerator):
         prog = f"{prompt}\n{sol}"
         return prog
 
-    def solve(self, eval, sample_id=0):
-        prompt = eval["Cobol_Eval"]
-        logger.info(f"Generating {eval['Program_name']}")
-        cht = ChatModelsGenerator()
-        sol = cht.chat(prompt, model=self.model_name)
+    def postprocess(self, prompt: str, sol: str):
+        """Turn a chat answer into the program to evaluate."""
         if self.prompt_type == "Complete":
             sol = extract_code_block(sol)
             program = self.construct(prompt, sol)
         else:
             program = extract_code_block(sol)
-        return program
\ No newline at end of file
+        return program
+
+    def request_key(self, prompt, sample_id):
+        """Response cache key of a chat request."""
+        return self.cache_key(prompt, sample_id, system_prompt_for(self.model_name),
+                              self.options.temperature, self.options.max_tokens)
+
+    def solve(self, eval, sample_id=0):
+        prompt = eval["Cobol_Eval"]
+        logger.info(f"Generating {eval['Program_name']}")
+        cht = ChatModelsGenerator()
+        sol = self.cached_response(
+            self.request_key(prompt, sample_id),
+            lambda: cht.chat(prompt, self.model_name, self.options.max_tokens, self.options.temperature)
+        )
+        return self.postprocess(prompt, sol)
+
+    def run_jobs(self, jobs):
+        """
+        Send all requests through the async engine, up to `options.concurrency` at a
+        time within the provider's rate budget, recording each sample as it finishes.
+        Responses already in the response cache are recorded without a request.
+        """
+        cht = ChatModelsGenerator()
+        provider = provider_for(self.model_name)
+        requests = []
+        by_key = {}
+        for eval, sample_id in jobs:
+            prompt = eval["Cobol_Eval"]
+            cache_key = self.request_key(prompt, sample_id)
+            cached = self.cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                self.record(eval, sample_id, self.postprocess(prompt, cached))
+                continue
+
+            key = f"{eval['Program_name']} (sample {sample_id})"
+            by_key[key] = (eval, sample_id, cache_key)
+
+            async def request(prompt=prompt):
+                return await cht.achat(prompt, self.model_name, self.options.max_tokens, self.options.temperature)
+
+            requests.append((provider, request, prompt, key))
+
+        def on_result(key, sol):
+            eval, sample_id, cache_key = by_key[key]
+            logger.info(f"Generated {eval['Program_name']} (sample {sample_id})")
+            if cache_key:
+                self.cache.put(cache_key, sol)
+            program = self.postprocess(eval["Cobol_Eval"], sol) if sol is not None else ""
+            self.record(eval, sample_id, program)
+
+        if not requests:
+            return
+        if self.options.batch:
+            self.run_batch(requests, on_result, by_key)
+        else:
+            # The async clients belong to the engine's event loop and are closed with it
+            AsyncGenerationEngine(self.options).run(requests, on_result, on_close=cht.registry.aclose)
+
+    def run_batch(self, requests, on_result, samples):
+        """
+        Generate all requests with one job of the provider's batch API.
+        Args:
+            requests (list): (provider, request, prompt, key) tuples as sent to the async engine.
+            on_result (callable): Called with (key, response) for every request; the
+                response is None if the request failed in the batch.
+            samples (dict): (task record, sample_id, cache key) of every request key.
+        """
+        submitter = BatchSubmitter(self.model_name, self.options.max_tokens, self.options.temperature,
+                                   self.options.batch_poll_interval)
+        # Requests are named after their task and sample, never their position, so a
+        # resumed batch can only hand a response to the sample it was generated for
+        custom_ids = {custom_id(samples[key][0]["Program_name"], samples[key][1]): key
+                      for _, _, _, key in requests}
+        path = os.path.join(self.output_path, f"{self.model_name}_{self.prompt_type.lower()}_batch.jsonl")
+        results = submitter.run([(request_id, prompt) for request_id, (_, _, prompt, _) in
+                                 zip(custom_ids, requests)], path)
+        for request_id, key in custom_ids.items():
+            on_result(key, results.get(request_id))
@@ -0,0 +1,153 @@
+import os
+import asyncio
+import threading
+from loguru import logger
+from dotenv import load_dotenv
+
+
+def provider_for(model):
+    """
+    Return the provider serving a model name.
+    Args:
+        model (str): The model to use (gpt-4o, gpt-35-turbo, claude-sonnet, claude-opus, gemini-pro)
+    Returns:
+        str: "GPT", "CLAUDE" or "GEMINI".
+    """
+    if "gpt" in model:
+        return "GPT"
+    elif "claude" in model:
+        return "CLAUDE"
+    elif "gemini" in model:
+        return "GEMINI"
+    raise ValueError("Please select correct model from available models. \n1. gpt-4o\n2. gpt-35\n3. claude-sonnet\n4. claude-opus\n5. gemini-pro")
+
+
+def provider_config(model):
+    """
+    Read the credentials of a model's provider from the environment (and .env).
+    Each provider is configured with {PROVIDER}_API_KEY and optionally {PROVIDER}_ENDPOINT,
+    which also points the client at a local mock server; GPT additionally reads GPT_API_VERSION.
+    Args:
+        model (str): The model name.
+    Returns:
+        dict: API_KEY, ENDPOINT, api_version and model.
+    """
+    load_dotenv(".env")
+    provider = provider_for(model)
+    return {
+        "API_KEY": os.getenv(f"{provider}_API_KEY"),
+        "ENDPOINT": os.getenv(f"{provider}_ENDPOINT") or None,
+        "api_version": os.getenv(f"{provider}_API_VERSION", "2024-02-01"),
+        "model": model
+    }
+
+
+class ProviderRegistry:
+    """
+    Long-lived API clients, one per provider, shared by every task and sample of a run.
+
+    Credentials are read once per provider, and each client keeps its HTTP connection
+    pool, so consecutive requests reuse keep-alive connections instead of opening a new
+    TLS session per prompt. Async clients are bound to the event loop that created
+    them and are rebuilt when a new loop asks for them.
+    """
+
+    def __init__(self):
+        self._configs = {}
+        self._clients = {}
+        self._async_clients = {}
+        self._async_loop = None
+        self._gemini_models = {}
+        self._gemini_configured = False
+        self._lock = threading.Lock()
+
+    def config(self, model):
+        """Return the provider configuration for a model, read from the environment once."""
+        provider = provider_for(model)
+        with self._lock:
+            if provider not in self._configs:
+                self._configs[provider] = provider_config(model)
+            return dict(self._configs[provider], model=model)
+
+    def client(self, model):
+        """Return the shared synchronous client for a model's provider."""
+        provider = provider_for(model)
+        configs = self.config(model)
+        with self._lock:
+            if provider not in self._clients:
+                self._clients[provider] = self._build(provider, configs)
+                logger.info(f"Created {provider} client")
+            return self._clients[provider]
+
+    def async_client(self, model):
+        """Return the shared async client for a model's provider in the running event loop."""
+        provider = provider_for(model)
+        configs = self.config(model)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._async_loop is not loop:
+                self._async_clients = {}
+                self._async_loop = loop
+            if provider not in self._async_clients:
+                self._async_clients[provider] = self._build(provider, configs, asynchronous=True)
+                logger.info(f"Created async {provider} client")
+            return self._async_clients[provider]
+
+    def _build(self, provider, configs, asynchronous=False):
+        # Provider SDKs are imported with their first client, so a run only loads the one it uses
+        if provider == "GPT":
+            from openai import AzureOpenAI, AsyncAzureOpenAI
+            client_class = AsyncAzureOpenAI if asynchronous else AzureOpenAI
+            return client_class(
+                azure_endpoint=configs["ENDPOINT"],
+                api_key=configs["API_KEY"],
+                api_version=configs["api_version"],
+            )
+        elif provider == "CLAUDE":
+            import anthropic
+            client_class = anthropic.AsyncAnthropic if asynchronous else anthropic.Anthropic
+            return client_class(api_key=configs["API_KEY"], base_url=configs.get("ENDPOINT"))
+        # Gemini keeps its transport inside the genai module, see gemini_model()
+        return None
+
+    def gemini_model(self, model, temperature=0.3, max_tokens=4096):
+        """Return the shared Gemini model instance for a model and generation config."""
+        import google.generativeai as genai
+
+        configs = self.config(model)
+        with self._lock:
+            if not self._gemini_configured:
+                client_options = {"api_endpoint": configs["ENDPOINT"]} if configs.get("ENDPOINT") else None
+                genai.configure(api_key=configs["API_KEY"], client_options=client_options)
+                self._gemini_configured = True
+            key = (model, temperature, max_tokens)
+            if key not in self._gemini_models:
+                self._gemini_models[key] = genai.GenerativeModel(
+                    model_name=model,
+                    generation_config={
+                        "temperature": temperature,
+                        "max_output_tokens": max_tokens,
+                    }
+                )
+            return self._gemini_models[key]
+
+    async def aclose(self):
+        """Close the async clients of the running event loop."""
+        with self._lock:
+            clients, self._async_clients = self._async_clients, {}
+            self._async_loop = None
+        for client in clients.values():
+            if client is not None:
+                await client.close()
+
+    def close(self):
+        """Close the synchronous clients and their connection pools."""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            if client is not None:
+                client.close()
+
+
+# Registry shared by every generator in the process
+registry = ProviderRegistry()
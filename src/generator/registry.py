@@ -0,0 +1,34 @@
+import importlib
+
+# Generation backends by --method, as (module, class). Backends are imported on first
+# use, so a run only loads the libraries of the backend it selected
+GENERATORS = {
+    "chat-api": ("src.generator.openai_chat", "OpenAIChat"),
+    "hf-instruct": ("src.generator.huggingface_instruct", "HuggingfaceInstruct"),
+    "hf-complete": ("src.generator.huggingface_complete", "HuggingfaceComplete"),
+    "hf-api": ("src.generator.huggingface_api", "HuggingfaceAPIInferenceGenerator"),
+}
+# Older names still accepted for --method
+ALIASES = {
+    "openai": "chat-api",
+}
+
+
+def methods():
+    """Return the --method names, aliases included."""
+    return list(GENERATORS) + list(ALIASES)
+
+
+def generator_class(method):
+    """
+    Import and return the generator class of a method.
+    Args:
+        method (str): A name from methods().
+    Returns:
+        type: The LLMGenerator subclass implementing the method.
+    """
+    method = ALIASES.get(method, method)
+    if method not in GENERATORS:
+        raise ValueError(f"Unknown method: {method}. Available methods: {', '.join(methods())}")
+    module_name, class_name = GENERATORS[method]
+    return getattr(importlib.import_module(module_name), class_name)
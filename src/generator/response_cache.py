@@ -0,0 +1,81 @@
+import json
+import hashlib
+from loguru import logger
+from src.utils.disk_cache import DiskCache, atomic_open
+
+
+class ResponseCacheMiss(KeyError):
+    """Raised in replay mode when a response is not in the cache."""
+
+
+class ResponseCache(DiskCache):
+    """
+    Content-addressed on-disk cache of raw model responses.
+
+    Entries are keyed on everything that determines a response: the generation method,
+    model, mode, system prompt, user prompt, temperature, max tokens and sample id.
+    Every entry is a JSON file; the cache is bounded by size and evicts least
+    recently used entries first (see DiskCache). In replay mode it is read-only
+    and a miss raises ResponseCacheMiss instead of letting the generator call the model.
+    """
+
+    SUFFIX = ".json"
+    DESCRIPTION = "response cache"
+
+    def __init__(self, cache_dir, max_size_mb=1024, replay=False):
+        super().__init__(cache_dir, max_size_mb)
+        self.replay = replay
+        logger.info(f"Response cache at {self.cache_dir} ({self.size() / (1024 * 1024):.1f} MB used"
+                    f"{', replay only' if replay else ''})")
+
+    @staticmethod
+    def key(method, model, mode, system_prompt, prompt, temperature, max_tokens, sample_id):
+        """
+        Compute the cache key of a request.
+        Returns:
+            str: The hex digest identifying the response.
+        """
+        payload = json.dumps([method, model, mode, system_prompt or "", prompt,
+                              temperature, max_tokens, sample_id])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a response.
+        Args:
+            key (str): The cache key from `key()`.
+        Returns:
+            str: The cached response, or None on a miss outside replay mode.
+        Raises:
+            ResponseCacheMiss: On a miss in replay mode.
+        """
+        path = self.entry_path(key)
+        try:
+            with open(path, "r") as f:
+                response = json.load(f)["response"]
+        except (OSError, ValueError, KeyError):
+            self.count(hit=False)
+            if self.replay:
+                raise ResponseCacheMiss(key)
+            return None
+        if not self.replay:
+            self.touch(path)
+        self.count(hit=True)
+        return response
+
+    def put(self, key, response):
+        """Store a response; a no-op in replay mode."""
+        if self.replay or response is None:
+            return
+        path = self.entry_path(key)
+        # Rewriting a key (e.g. a failed response re-generated) replaces its entry
+        replaced = self.entry_size(path)
+        try:
+            data = json.dumps({"response": response})
+            with atomic_open(path) as f:
+                f.write(data)
+            size = len(data.encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"Could not store response cache entry {key}: {e}")
+            return
+        self.added(size - replaced)
@@ -1,5 +1,5 @@
 # This file initializes the utils package.
 from .file_utils import json_to_csv
 from .models import Model
-from .command_utils import execute_command, cleanup_dylib, cleanup_file
+from .command_utils import execute_command, launch, cleanup_dylib, cleanup_file
 from .code_extractor import extract_code_block, swap_sections
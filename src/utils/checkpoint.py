@@ -0,0 +1,81 @@
+import os
+import json
+import threading
+from loguru import logger
+
+
+class CheckpointLog:
+    """
+    Append-only JSONL log of finished work items.
+
+    Every record is flushed and fsync'ed as soon as it is appended, so a crash,
+    OOM kill or Ctrl-C loses at most the item that was in flight. Records are
+    identified by their "key" field; when a key appears several times the last
+    record wins.
+    """
+
+    def __init__(self, path, durable=True):
+        self.path = path
+        self.durable = durable
+        self._lock = threading.Lock()
+        self._file = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def load(self):
+        """
+        Read the records written so far.
+        Returns:
+            dict: Records keyed by their "key" field. A torn last line is ignored.
+        """
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, "r") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping unreadable checkpoint line {line_number} in {self.path}")
+                    continue
+                records[record["key"]] = record
+        return records
+
+    def reset(self):
+        """Discard all records, starting a new log."""
+        with self._lock:
+            self._close()
+            open(self.path, "w").close()
+
+    def append(self, record):
+        """
+        Durably append a record.
+        Args:
+            record (dict): A JSON-serializable record with a "key" field.
+        """
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a")
+            self._file.write(line)
+            self._file.flush()
+            if self.durable:
+                os.fsync(self._file.fileno())
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
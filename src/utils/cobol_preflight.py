@@ -0,0 +1,104 @@
+import re
+from typing import Iterable, List
+from .code_extractor import section_header
+from .models import PreflightResult
+
+# Valid characters for the indicator area (column 7) in fixed format
+INDICATORS = set(" *-/Dd$")
+# Sections that belong to the DATA DIVISION and cannot follow the PROCEDURE DIVISION
+DATA_SECTIONS = {"data", "file", "working_storage", "local_storage", "linkage"}
+FREE_FORMAT = re.compile(r">>\s*SOURCE\s+(FORMAT\s+)?(IS\s+)?FREE", re.IGNORECASE)
+
+
+def preflight(program: str) -> PreflightResult:
+    """
+    Check a fixed-format COBOL program for problems that make cobc fail for certain.
+
+    Fatal reason codes, in the order they are checked:
+    - empty_program: nothing but whitespace (or a missing value read as "nan");
+    - markdown_fence: a leftover ``` line from the model's markdown answer;
+    - missing_identification_division: neither an IDENTIFICATION DIVISION header
+      nor a PROGRAM-ID paragraph;
+    - invalid_indicator: a character other than space, *, -, /, D or $ in column 7,
+      which is what code shifted into the sequence/indicator area looks like;
+    - section_order: a DATA DIVISION section after the PROCEDURE DIVISION;
+    - unbalanced_procedure_division: a program with more than one PROCEDURE
+      DIVISION, or an END PROGRAM without a matching program.
+    Text past column 72 is ignored by cobc and only reported as the warning
+    text_beyond_column_72.
+    Args:
+        program (str): The program source, as it will be written to the .cbl file.
+    Returns:
+        PreflightResult: Whether the program should be compiled and why not.
+    """
+    if not program.strip() or program.strip() == "nan":
+        return PreflightResult(ok=False, reason="empty_program")
+
+    lines = program.expandtabs(8).split("\n")
+    fixed_format = not any(FREE_FORMAT.search(line) for line in lines)
+    warnings = []
+    has_identification = False
+    programs = 0
+    procedure_divisions = 0
+    in_procedure = False
+
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            return PreflightResult(ok=False, reason="markdown_fence")
+        if not stripped or stripped.startswith(">>"):
+            continue
+
+        if fixed_format:
+            if len(line) > 6 and line[6] not in INDICATORS:
+                return PreflightResult(ok=False, reason="invalid_indicator")
+            if len(line) > 6 and line[6] in "*/":
+                continue
+            if len(line) > 72 and line[72:].strip() and "text_beyond_column_72" not in warnings:
+                warnings.append("text_beyond_column_72")
+            code = line[7:72]
+        else:
+            code = line
+
+        if code.strip().upper().startswith("PROGRAM-ID"):
+            has_identification = True
+        header = section_header(code)
+        if header == "identification":
+            has_identification = True
+            programs += 1
+            procedure_divisions = 0
+            in_procedure = False
+        elif header == "procedure":
+            procedure_divisions += 1
+            in_procedure = True
+            if procedure_divisions > 1:
+                return PreflightResult(ok=False, reason="unbalanced_procedure_division")
+        elif header == "end_program":
+            programs -= 1
+            in_procedure = False
+            if programs < 0:
+                return PreflightResult(ok=False, reason="unbalanced_procedure_division")
+        elif header in DATA_SECTIONS and in_procedure:
+            return PreflightResult(ok=False, reason="section_order")
+
+    if not has_identification:
+        return PreflightResult(ok=False, reason="missing_identification_division")
+    return PreflightResult(ok=True, warnings=warnings)
+
+
+def preflight_programs(programs: Iterable[str]) -> List[PreflightResult]:
+    """
+    Pre-flight check a batch of programs in one pass.
+    Identical sources, common when many samples agree, are only checked once.
+    Args:
+        programs (Iterable[str]): Program sources in evaluation order.
+    Returns:
+        List[PreflightResult]: One result per program, in the same order.
+    """
+    seen = {}
+    results = []
+    for program in programs:
+        if program not in seen:
+            seen[program] = preflight(program)
+        results.append(seen[program])
+    return results
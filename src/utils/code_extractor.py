@@ -23,6 +23,30 @@ def extract_code_block(src: str) -> List[str]:
         return code_blocks[0]
     return src
 
+# Line prefixes that open a COBOL division or section, and the name they map to
+SECTION_HEADERS = (
+    ("IDENTIFICATION DIVISION", "identification"),
+    ("ID DIVISION", "identification"),
+    ("ENVIRONMENT DIVISION", "environment"),
+    ("DATA DIVISION", "data"),
+    ("FILE SECTION.", "file"),
+    ("WORKING-STORAGE SECTION.", "working_storage"),
+    ("LOCAL-STORAGE SECTION.", "local_storage"),
+    ("LINKAGE SECTION.", "linkage"),
+    ("PROCEDURE DIVISION", "procedure"),
+    ("END PROGRAM", "end_program"),
+)
+
+def section_header(line: str):
+    """
+    Return the name of the division or section a line opens, or None
+    """
+    stripped_line = line.strip().upper()
+    for prefix, name in SECTION_HEADERS:
+        if stripped_line.startswith(prefix):
+            return name
+    return None
+
 def swap_sections(src: str) -> str:
     """
     Swap the Working Storage and Linkage Sections
@@ -31,12 +55,12 @@ def swap_sections(src: str) -> str:
     current_section = begin
 
     for line in src.split("\n"):
-        stripped_line = line.strip().upper()
-        if stripped_line.startswith("WORKING-STORAGE SECTION."):
+        header = section_header(line)
+        if header == "working_storage":
             current_section = working_storage
-        elif stripped_line.startswith("LINKAGE SECTION."):
+        elif header == "linkage":
             current_section = linkage
-        elif stripped_line.startswith("PROCEDURE DIVISION"):
+        elif header == "procedure":
             current_section = procedure
             line = "       PROCEDURE DIVISION USING LINKED-ITEMS."
         current_section.append(line)
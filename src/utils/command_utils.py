@@ -1,17 +1,210 @@
 import os
+import time
+import shlex
+import sys
+import shutil
+import signal
+import resource
+import selectors
+import subprocess
+from functools import lru_cache
+from collections import deque
 from loguru import logger
+from .models import ExecutionLimits, ProcessResult
+
+# Bytes of stdout/stderr kept from a launched process
+CAPTURE_LIMIT = 64 * 1024
+# Bytes read from a pipe at a time
+READ_SIZE = 64 * 1024
+# Script that applies resource limits and then execs the program, see limited_argv()
+RLIMIT_EXEC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rlimit_exec.py")
+# prlimit(1) options of the limits resource_limits() sets
+PRLIMIT_OPTIONS = {resource.RLIMIT_CPU: "--cpu", resource.RLIMIT_AS: "--as", resource.RLIMIT_FSIZE: "--fsize"}
+# A program that failed with a peak RSS this close to the memory limit ran out of memory
+OOM_RSS_FRACTION = 0.9
+
+class RingBuffer:
+    """Keeps the last `capacity` bytes written to it and whether anything was dropped."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.truncated = False
+        self._chunks = deque()
+        self._size = 0
+
+    def write(self, data: bytes) -> None:
+        self._chunks.append(data)
+        self._size += len(data)
+        while self._size > self.capacity:
+            self.truncated = True
+            excess = self._size - self.capacity
+            head = self._chunks[0]
+            if len(head) <= excess:
+                self._chunks.popleft()
+                self._size -= len(head)
+            else:
+                self._chunks[0] = head[excess:]
+                self._size -= excess
+
+    def getvalue(self) -> str:
+        return b"".join(self._chunks).decode("utf-8", errors="replace")
+
+def resource_limits(limits: ExecutionLimits) -> list:
+    """Translate ExecutionLimits into (resource, (soft, hard)) pairs."""
+    rlimits = []
+    if limits.cpu_time:
+        # The soft limit delivers SIGXCPU, the hard limit a SIGKILL one second later
+        rlimits.append((resource.RLIMIT_CPU, (limits.cpu_time, limits.cpu_time + 1)))
+    if limits.memory_mb:
+        size = limits.memory_mb * 1024 * 1024
+        rlimits.append((resource.RLIMIT_AS, (size, size)))
+    if limits.output_mb:
+        size = limits.output_mb * 1024 * 1024
+        rlimits.append((resource.RLIMIT_FSIZE, (size, size)))
+    return rlimits
+
+@lru_cache(maxsize=None)
+def prlimit_path():
+    """Path of util-linux prlimit(1), None where it is not installed (e.g. macOS)."""
+    return shutil.which("prlimit")
+
+def limited_argv(argv: list, rlimits: list) -> list:
+    """
+    Wrap a command line so the program starts under the given resource limits.
+    The limits are set by a separate single-threaded process right before it execs
+    the program, never between fork and exec in this (threaded) process. That is
+    prlimit(1) where available, which costs about a millisecond per launch;
+    elsewhere rlimit_exec.py, which pays for a Python start-up.
+    Args:
+        argv (list): The program and its arguments.
+        rlimits (list): (resource, (soft, hard)) pairs, see resource_limits().
+    Returns:
+        list: The command line to launch, `argv` itself when there are no limits.
+    """
+    if not rlimits:
+        return list(argv)
+    prlimit = prlimit_path()
+    if prlimit and all(res in PRLIMIT_OPTIONS for res, _ in rlimits):
+        # Popen restores SIGPIPE and SIGXFSZ to their defaults before exec
+        return [prlimit, *(f"{PRLIMIT_OPTIONS[res]}={soft}:{hard}" for res, (soft, hard) in rlimits), "--", *argv]
+    spec = ",".join(f"{res}:{soft}:{hard}" for res, (soft, hard) in rlimits)
+    return [sys.executable, "-S", RLIMIT_EXEC, spec, *argv]
+
+def classify_outcome(returncode: int, timed_out: bool, duration: float,
+                     limits: ExecutionLimits = None, peak_rss_kb: int = 0) -> str:
+    """
+    Map the way a process ended to a ProcessResult status.
+    Only the exit status and the resource usage are considered, never the program's
+    output: "oom" needs a failed process whose peak RSS reached the memory limit.
+    Under RLIMIT_AS an allocation fails instead of killing the process, so libcob and
+    most programs then exit with an error code rather than a signal.
+    """
+    if timed_out:
+        return "timeout"
+    if limits is not None:
+        if returncode in (-signal.SIGXCPU, -signal.SIGKILL) and limits.cpu_time and duration >= limits.cpu_time:
+            return "cpu_timeout"
+        if returncode == -signal.SIGXFSZ:
+            return "output_limit"
+        if (returncode != 0 and limits.memory_mb
+                and peak_rss_kb >= OOM_RSS_FRACTION * limits.memory_mb * 1024):
+            return "oom"
+    if returncode != 0:
+        return "failed"
+    return "ok"
+
+def launch(argv: list, cwd: str = None, limits: ExecutionLimits = None,
+           capture_limit: int = CAPTURE_LIMIT) -> ProcessResult:
+    """
+    Run a program directly (no shell) and return a structured result.
+
+    stdout and stderr are streamed into ring buffers that keep only the last
+    `capture_limit` bytes, so a chatty program cannot grow our memory. With
+    `limits`, the program runs in its own session under RLIMIT_CPU/AS/FSIZE (set
+    by limited_argv) and its whole process group is killed when the wall-clock
+    timeout expires.
+    Args:
+        argv (list): The program and its arguments.
+        cwd (str): Working directory for the program.
+        limits (ExecutionLimits): Resource limits to enforce, none if not given.
+        capture_limit (int): Bytes of stdout and of stderr to keep.
+    Returns:
+        ProcessResult: Return code, status, captured output, wall and CPU time,
+        truncation flags and peak RSS.
+    """
+    rlimits = resource_limits(limits) if limits else []
+
+    logger.debug(f"Launching {' '.join(argv)} (cwd={cwd})")
+    start = time.monotonic()
+    proc = subprocess.Popen(limited_argv(argv, rlimits), cwd=cwd, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=limits is not None)
+
+    buffers = {proc.stdout.fileno(): RingBuffer(capture_limit), proc.stderr.fileno(): RingBuffer(capture_limit)}
+    deadline = start + limits.timeout if limits and limits.timeout else None
+    timed_out = False
+    with selectors.DefaultSelector() as selector:
+        selector.register(proc.stdout, selectors.EVENT_READ)
+        selector.register(proc.stderr, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                timed_out = True
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                break
+            for key, _ in selector.select(remaining):
+                data = os.read(key.fd, READ_SIZE)
+                if data:
+                    buffers[key.fd].write(data)
+                else:
+                    selector.unregister(key.fileobj)
+
+    stdout_buffer, stderr_buffer = buffers[proc.stdout.fileno()], buffers[proc.stderr.fileno()]
+    proc.stdout.close()
+    proc.stderr.close()
+    # wait4 reaps the child and reports its resource usage in one call. A program
+    # that closed its pipes but keeps running is still held to the deadline. The
+    # poll starts short since a program usually exits right after closing its pipes.
+    pid = 0
+    delay = 0.0005
+    while deadline is not None and not timed_out:
+        pid, wait_status, usage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            break
+        if time.monotonic() >= deadline:
+            timed_out = True
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.01)
+    if not pid:
+        _, wait_status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(wait_status)
+    duration = time.monotonic() - start
+
+    stderr = stderr_buffer.getvalue()
+    return ProcessResult(
+        returncode=proc.returncode,
+        status=classify_outcome(proc.returncode, timed_out, duration, limits, usage.ru_maxrss),
+        stdout=stdout_buffer.getvalue(),
+        stderr=stderr,
+        duration=duration,
+        cpu_time=usage.ru_utime + usage.ru_stime,
+        stdout_truncated=stdout_buffer.truncated,
+        stderr_truncated=stderr_buffer.truncated,
+        peak_rss_kb=usage.ru_maxrss
+    )
 
 def execute_command(cmd: str) -> str:
-    import subprocess
-    """Execute a shell command and return the output."""
-    try:
-        logger.info(f"Executing command: {cmd}")
-        result = subprocess.run(cmd, shell=True, text=True, capture_output=True, check=True)
-        logger.info(f"Command executed successfully: {result.stdout}")
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Command failed with return code {e.returncode}: {e.stderr}")
-        raise e
+    """Execute a command line without a shell and return its output."""
+    result = launch(shlex.split(cmd))
+    if result.returncode != 0:
+        logger.error(f"Command failed with return code {result.returncode}: {result.stderr}")
+        raise subprocess.CalledProcessError(result.returncode, cmd, result.stdout, result.stderr)
+    logger.info(f"Command executed successfully in {result.duration:.2f}s ({len(result.stdout)} bytes of output)")
+    return result.stdout
 
 def cleanup_dylib(name: str) -> None:
     """Remove the specified .dylib file if it exists."""
@@ -27,4 +220,4 @@ def cleanup_file(name: str) -> None:
         os.remove(name)
         logger.info(f"Successfully removed {name}")
     except FileNotFoundError:
-        logger.warning(f"File {name} not found")
\ No newline at end of file
+        logger.warning(f"File {name} not found")
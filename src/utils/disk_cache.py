@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from loguru import logger
+
+
+@contextmanager
+def atomic_open(path, mode="w"):
+    """
+    Open a file that replaces `path` only once the block completes.
+    The content is written to a temporary file in the same folder and renamed over
+    `path`, so readers (and concurrent writers) never see a partial file; on error
+    the temporary file is removed and `path` is left untouched.
+    Args:
+        path (str): The file to write.
+        mode (str): "w" for text or "wb" for binary content.
+    Yields:
+        The open temporary file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, staging = tempfile.mkstemp(prefix=".staging-", suffix=os.path.splitext(path)[1], dir=directory)
+    try:
+        with os.fdopen(fd, mode) as f:
+            yield f
+        os.replace(staging, path)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+
+class DiskCache:
+    """
+    Size-bounded, content-addressed on-disk cache.
+
+    Entries are files or folders named after their key and sharded by its first two
+    characters (cache_dir/ab/abcd...). The cache tracks its size, counts hits and
+    misses, and evicts least recently used entries first once it outgrows its
+    budget; an entry's modification time is its last use. Subclasses read and
+    write the entries themselves and report them through touch() and added().
+    """
+
+    # Appended to the key to name an entry
+    SUFFIX = ""
+    # What the cache holds, for log messages
+    DESCRIPTION = "cache"
+
+    def __init__(self, cache_dir, max_size_mb=1024):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = sum(self.entry_size(path) for path in self.entries())
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}{self.SUFFIX}")
+
+    def entries(self):
+        """Yield the path of every complete entry; staging files and folders are skipped."""
+        for shard in os.listdir(self.cache_dir):
+            shard_path = os.path.join(self.cache_dir, shard)
+            if len(shard) != 2 or not os.path.isdir(shard_path):
+                continue
+            for name in os.listdir(shard_path):
+                if not name.startswith(".") and name.endswith(self.SUFFIX):
+                    yield os.path.join(shard_path, name)
+
+    @staticmethod
+    def entry_size(path):
+        """Bytes used by an entry file, or by the files of an entry folder."""
+        if not os.path.isdir(path):
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                return 0
+        size = 0
+        for name in os.listdir(path):
+            try:
+                size += os.path.getsize(os.path.join(path, name))
+            except OSError:
+                pass
+        return size
+
+    def count(self, hit):
+        """Count a lookup as a hit or a miss."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @staticmethod
+    def touch(path):
+        """Mark an entry as recently used, so eviction keeps it longer."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def added(self, size):
+        """
+        Account for `size` more bytes (negative when an entry shrank), evicting old
+        entries if the cache is over budget.
+        """
+        with self._lock:
+            self._size += size
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its size budget."""
+        with self._lock:
+            entries = []
+            for path in self.entries():
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                entries.append((mtime, self.entry_size(path), path))
+            entries.sort()
+
+            self._size = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in entries:
+                if self._size <= self.max_bytes:
+                    break
+                try:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
+                except OSError:
+                    continue
+                self._size -= size
+                removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} {self.DESCRIPTION} entries")
+
+    def size(self):
+        """Return the bytes currently used by the cache."""
+        return self._size
+
+    def stats(self):
+        """Return the hit/miss counters for this run."""
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,88 @@
+from typing import Optional, Sequence
+
+
+def bounded_indel_distance(a: Sequence, b: Sequence, max_cost: Optional[int] = None) -> Optional[int]:
+    """
+    Insert/delete edit distance between two sequences, giving up past a cost ceiling.
+
+    Uses Myers' O((N+M)·D) diff algorithm, so the work grows with the distance D
+    rather than with N·M, and is bounded by `max_cost`. Elements only need to
+    support equality, which makes it work on characters, lines or tokens alike.
+    Args:
+        a (Sequence): The first sequence.
+        b (Sequence): The second sequence.
+        max_cost (int): Largest distance worth computing, unbounded if None.
+    Returns:
+        int: The number of insertions and deletions turning `a` into `b`, or
+        None when it exceeds `max_cost`.
+    """
+    # Common prefixes and suffixes never contribute to the distance
+    start = 0
+    end_a, end_b = len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+
+    n, m = len(a), len(b)
+    limit = n + m if max_cost is None else min(max_cost, n + m)
+    if abs(n - m) > limit:
+        return None
+    if n == 0 or m == 0:
+        return n + m
+
+    offset = limit + 1
+    furthest = [0] * (2 * limit + 3)
+    for d in range(limit + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and furthest[offset + k - 1] < furthest[offset + k + 1]):
+                x = furthest[offset + k + 1]
+            else:
+                x = furthest[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            furthest[offset + k] = x
+            if x >= n and y >= m:
+                return d
+    return None
+
+
+def indel_similarity(a: Sequence, b: Sequence, max_cost: Optional[int] = None) -> float:
+    """
+    Similarity ratio 1 - D / (len(a) + len(b)) based on bounded_indel_distance.
+    This is the ratio Levenshtein.ratio reports; it is 0.0 when the distance
+    exceeds `max_cost` or both sequences are empty.
+    """
+    total = len(a) + len(b)
+    if total == 0:
+        return 0.0
+    distance = bounded_indel_distance(a, b, max_cost)
+    if distance is None:
+        return 0.0
+    return 1.0 - distance / total
+
+
+def lcs_length(a: Sequence, b: Sequence) -> int:
+    """
+    Length of the longest common subsequence of two sequences.
+
+    Uses the bit-parallel algorithm of Allison-Dix/Hyyrö: `b` is encoded as one
+    bit vector per distinct element and every element of `a` costs a handful of
+    operations on len(b)-bit integers, so the work is O(N·M/w) machine words and
+    close to linear for programs of a few thousand tokens. Elements need to be
+    hashable.
+    """
+    masks = {}
+    for position, element in enumerate(b):
+        masks[element] = masks.get(element, 0) | (1 << position)
+    full = (1 << len(b)) - 1
+    row = full
+    for element in a:
+        matches = row & masks.get(element, 0)
+        row = ((row + matches) | (row - matches)) & full
+    # Every cleared bit marks one element of the common subsequence
+    return len(b) - bin(row).count("1")
@@ -1,6 +1,5 @@
 import os
 import json
-import pandas as pd
 
 def read_file(file_path: str) -> str:
     """Read the contents of a file and return it as a string."""
@@ -27,6 +26,8 @@ def delete_file(file_path: str) -> None:
         os.remove(file_path)
         
 def json_to_csv(json_file_path, csv_file_path):
+    import pandas as pd
+
     try:
         # Read the JSON file
         with open(json_file_path, 'r') as file:
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 @dataclass
 class Model:
@@ -34,3 +34,93 @@ class Result:
     returncode: int
     error: str = None
 
+@dataclass
+class ExecutionLimits:
+    """
+    Resource limits applied to every executed program.
+    Attributes:
+        timeout (float): Wall-clock limit in seconds.
+        cpu_time (int): CPU time limit in seconds (RLIMIT_CPU).
+        memory_mb (int): Address space limit in MB (RLIMIT_AS).
+        output_mb (int): Largest file, including captured stdout/stderr, in MB (RLIMIT_FSIZE).
+    """
+    timeout: float = 10.0
+    cpu_time: int = 10
+    memory_mb: int = 2048
+    output_mb: int = 64
+
+@dataclass
+class ProcessResult:
+    """
+    Outcome of a launched process.
+    Attributes:
+        returncode (int): Return code, negative if the process was killed by a signal.
+        status (str): One of "ok", "failed", "timeout", "cpu_timeout", "oom" or "output_limit".
+        stdout (str): Captured standard output (the last bytes if truncated).
+        stderr (str): Captured standard error (the last bytes if truncated).
+        duration (float): Wall-clock run time in seconds.
+        cpu_time (float): User plus system CPU time in seconds.
+        stdout_truncated (bool): Whether stdout exceeded the capture limit.
+        stderr_truncated (bool): Whether stderr exceeded the capture limit.
+        peak_rss_kb (int): Peak resident set size in KB.
+    """
+    returncode: int
+    status: str
+    stdout: str = ""
+    stderr: str = ""
+    duration: float = 0.0
+    cpu_time: float = 0.0
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+    peak_rss_kb: int = 0
+
+@dataclass
+class PreflightResult:
+    """
+    Outcome of the structural pre-flight check of a COBOL program.
+    Attributes:
+        ok (bool): False if the program is certain to fail compilation.
+        reason (str): Reason code of the first fatal problem, None if ok.
+        warnings (list): Reason codes of problems that do not prevent compilation.
+    """
+    ok: bool
+    reason: str = None
+    warnings: list = field(default_factory=list)
+
+@dataclass
+class GenerationOptions:
+    """
+    Request settings for API-based generation.
+    Attributes:
+        concurrency (int): Requests in flight at once per provider.
+        requests_per_minute (int): Request budget per provider, 0 for no limit.
+        tokens_per_minute (int): Prompt plus completion token budget per provider, 0 for no limit.
+        max_tokens (int): Largest completion requested.
+        temperature (float): Sampling temperature.
+        retries (int): Attempts after a failed request before the sample is left empty.
+        batch (bool): Send all requests as one job of the provider's batch API.
+        batch_poll_interval (float): Seconds between two status checks of a batch job.
+    """
+    concurrency: int = 1
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    max_tokens: int = 4096
+    temperature: float = 0.3
+    retries: int = 3
+    batch: bool = False
+    batch_poll_interval: float = 30
+
+@dataclass
+class CPUInferenceOptions:
+    """
+    Settings for running local Hugging Face models on CPU.
+    Attributes:
+        quantize (bool): Quantize Linear layers to int8 with dynamic quantization.
+        threads (int): Intra-op threads used by torch, 0 for the torch default.
+        interop_threads (int): Inter-op threads used by torch, 0 for the torch default.
+        compile (bool): Compile the model forward pass with torch.compile.
+    """
+    quantize: bool = False
+    threads: int = 0
+    interop_threads: int = 0
+    compile: bool = False
@@ -0,0 +1,127 @@
+import os
+from loguru import logger
+from .disk_cache import atomic_open
+
+# Every row is identified by its program and sample
+KEY_COLUMNS = ("Program_name", "sample_id")
+# Columns of every stage file, after the key columns
+STAGES = {
+    "programs": ("Cobol_Eval", "Expected_Program", "Generated_program"),
+    "bert": ("Bert_score",),
+    "compile": ("Code Similarity Score", "Preflight", "Compiled", "Executed", "Exec_status", "Result_match"),
+}
+# Fixed column types, as Arrow type names
+SCHEMA = {
+    "Program_name": "string",
+    "sample_id": "int64",
+    "Cobol_Eval": "string",
+    "Expected_Program": "string",
+    "Generated_program": "string",
+    "Bert_score": "float64",
+    "Code Similarity Score": "float64",
+    "Preflight": "string",
+    "Compiled": "int64",
+    "Executed": "int64",
+    "Exec_status": "string",
+    "Result_match": "float64",
+}
+
+
+class ResultStore:
+    """
+    Columnar store of generation and evaluation results.
+
+    Results live in Parquet files partitioned by model and mode
+    (root/model=<model>/mode=<mode>/). Every stage owns one file holding the row
+    keys (Program_name, sample_id) and only its own columns, so a stage adds its
+    results without rewriting the program text, and a report reads just the
+    columns it needs. Rows of the different stages are joined on the key.
+    """
+
+    def __init__(self, root="results"):
+        self.root = os.path.abspath(root)
+
+    def partition(self, model, mode):
+        """Return the folder holding the results of a model and mode."""
+        return os.path.join(self.root, f"model={model}", f"mode={mode.lower()}")
+
+    def stage_path(self, model, mode, stage):
+        return os.path.join(self.partition(model, mode), f"{stage}.parquet")
+
+    @staticmethod
+    def schema(columns):
+        import pyarrow as pa
+
+        return pa.schema([(name, pa.type_for_alias(SCHEMA[name])) for name in columns])
+
+    def write_stage(self, model, mode, stage, df):
+        """
+        Store the results of a stage, replacing its previous results.
+        Args:
+            model (str): The model name.
+            mode (str): "Instruct" or "Complete".
+            stage (str): A name from STAGES.
+            df (pd.DataFrame): The key columns and the stage columns; a missing
+                sample_id defaults to 0, as one sample per task did before samples had ids.
+        Returns:
+            str: Path of the stage file.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if stage not in STAGES:
+            raise ValueError(f"Unknown result stage: {stage}. Available stages: {', '.join(STAGES)}")
+        columns = KEY_COLUMNS + STAGES[stage]
+        df = df.copy()
+        if "sample_id" not in df:
+            df["sample_id"] = 0
+        missing = [name for name in columns if name not in df]
+        if missing:
+            raise ValueError(f"The {stage} results have no {', '.join(missing)} column")
+        table = pa.Table.from_pandas(df[list(columns)], schema=self.schema(columns), preserve_index=False)
+
+        path = self.stage_path(model, mode, stage)
+        with atomic_open(path, "wb") as f:
+            pq.write_table(table, f, compression="zstd")
+        logger.info(f"Stored {len(df)} {stage} results in {path}")
+        return path
+
+    def stages(self, model, mode):
+        """Return the stages with stored results for a model and mode."""
+        return [stage for stage in STAGES if os.path.exists(self.stage_path(model, mode, stage))]
+
+    def read(self, model, mode, columns=None):
+        """
+        Load results of a model and mode, reading only the requested columns.
+        Args:
+            model (str): The model name.
+            mode (str): "Instruct" or "Complete".
+            columns (list): Columns to load besides the keys, every stored column if None.
+                Columns of stages without results are filled with missing values.
+        Returns:
+            pd.DataFrame: One row per program sample, in the order of the programs stage
+            (or of the first stage read when there is no programs stage).
+        """
+        import pyarrow.parquet as pq
+
+        stored = self.stages(model, mode)
+        if columns is None:
+            columns = [name for stage in stored for name in STAGES[stage]]
+        unknown = [name for name in columns if name not in SCHEMA]
+        if unknown:
+            raise ValueError(f"Unknown result columns: {', '.join(unknown)}")
+
+        result = None
+        for stage in STAGES:
+            wanted = [name for name in STAGES[stage] if name in columns]
+            if stage not in stored or (stage != "programs" and not wanted):
+                continue
+            table = pq.read_table(self.stage_path(model, mode, stage), columns=list(KEY_COLUMNS) + wanted)
+            df = table.to_pandas()
+            result = df if result is None else result.merge(df, on=list(KEY_COLUMNS), how="left")
+        if result is None:
+            raise FileNotFoundError(f"No results stored for {model} in {mode} mode under {self.root}")
+        for name in columns:
+            if name not in result:
+                result[name] = None
+        return result[list(KEY_COLUMNS) + [name for name in columns if name not in KEY_COLUMNS]]
@@ -0,0 +1,37 @@
+"""
+Apply resource limits to the current process and exec a program.
+
+launch() starts programs through this script instead of setting the limits in a
+`preexec_fn`, which runs Python in the forked child and can deadlock when the
+parent has other threads (the compile-and-execute worker pool). This process is
+single-threaded, so setting the limits here is safe; exec keeps them. Python
+ignores SIGPIPE and SIGXFSZ and exec would keep that too, so both are reset first:
+a program writing past RLIMIT_FSIZE must die of SIGXFSZ (reported as
+"output_limit") rather than get EFBIG. The script only uses the standard library
+so that starting it stays cheap.
+
+Usage: python rlimit_exec.py <resource>:<soft>:<hard>[,...] <program> [<arg> ...]
+"""
+import os
+import sys
+import signal
+import resource
+
+
+def main(argv):
+    spec, program = argv[1], argv[2:]
+    for limit in filter(None, spec.split(",")):
+        res, soft, hard = (int(value) for value in limit.split(":"))
+        resource.setrlimit(res, (soft, hard))
+    for signum in (signal.SIGPIPE, signal.SIGXFSZ):
+        signal.signal(signum, signal.SIG_DFL)
+    try:
+        os.execvp(program[0], program)
+    except OSError as e:
+        sys.stderr.write(f"cannot execute {program[0]}: {e}\n")
+        # The shell's exit status for a command that cannot be run
+        return 127
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
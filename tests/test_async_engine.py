@@ -0,0 +1,79 @@
+import asyncio
+from src.generator import async_engine
+from src.generator.async_engine import AsyncGenerationEngine
+from src.utils.models import GenerationOptions
+
+
+def no_backoff(monkeypatch):
+    # Retries back off for seconds; the mock clients fail on purpose
+    sleep = asyncio.sleep
+    monkeypatch.setattr(async_engine.asyncio, "sleep", lambda delay: sleep(0))
+
+
+class MockClient:
+    """Stand-in for an async provider client that records how many requests overlap."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    async def create(self, prompt):
+        self.calls += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("connection reset")
+            return f"response to {prompt}"
+        finally:
+            self.in_flight -= 1
+
+
+def jobs_for(client, prompts, provider="GPT"):
+    return [(provider, lambda prompt=prompt: client.create(prompt), prompt, prompt) for prompt in prompts]
+
+
+def test_every_result_is_handed_over_within_the_concurrency_limit():
+    client = MockClient()
+    results = {}
+    prompts = [f"prompt {i}" for i in range(20)]
+    AsyncGenerationEngine(GenerationOptions(concurrency=4)).run(jobs_for(client, prompts), results.__setitem__)
+    assert results == {prompt: f"response to {prompt}" for prompt in prompts}
+    assert client.peak == 4
+
+
+def test_each_provider_has_its_own_limit():
+    gpt, claude = MockClient(), MockClient()
+    jobs = jobs_for(gpt, [f"gpt {i}" for i in range(6)]) + jobs_for(claude, [f"claude {i}" for i in range(6)], "CLAUDE")
+    results = {}
+    AsyncGenerationEngine(GenerationOptions(concurrency=2)).run(jobs, results.__setitem__)
+    assert len(results) == 12
+    assert gpt.peak == claude.peak == 2
+
+
+def test_failed_requests_are_retried(monkeypatch):
+    no_backoff(monkeypatch)
+    client = MockClient(failures=2)
+    results = {}
+    AsyncGenerationEngine(GenerationOptions(retries=3)).run(jobs_for(client, ["prompt"]), results.__setitem__)
+    assert results == {"prompt": "response to prompt"}
+    assert client.calls == 3
+
+
+def test_a_request_failing_every_attempt_yields_none(monkeypatch):
+    no_backoff(monkeypatch)
+    client = MockClient(failures=10)
+    results = {}
+    closed = []
+
+    async def on_close():
+        closed.append(True)
+
+    AsyncGenerationEngine(GenerationOptions(retries=2)).run(jobs_for(client, ["prompt"]), results.__setitem__, on_close)
+    assert results == {"prompt": None}
+    assert client.calls == 3
+    assert closed == [True]
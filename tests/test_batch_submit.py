@@ -0,0 +1,158 @@
+import re
+import json
+import pytest
+from types import SimpleNamespace
+from src.data.task_store import TaskStore
+from src.generator.batch_submit import BatchSubmitter, MAX_CUSTOM_ID, custom_id
+
+CUSTOM_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class MockGPTClient:
+    """Stand-in for the Azure OpenAI client: files plus the batches API."""
+
+    def __init__(self):
+        self.submitted = []
+        self.retrieved = []
+        self.requests = {}
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve)
+
+    def _create_file(self, file, purpose):
+        file_id = f"file-{len(self.requests)}"
+        self.requests[file_id] = [json.loads(line) for line in file.read().decode().splitlines()]
+        return SimpleNamespace(id=file_id)
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        batch_id = f"batch-{len(self.submitted)}"
+        self.submitted.append((batch_id, input_file_id))
+        return SimpleNamespace(id=batch_id)
+
+    def _retrieve(self, batch_id):
+        self.retrieved.append(batch_id)
+        return SimpleNamespace(id=batch_id, status="completed", output_file_id=f"output-{batch_id}",
+                               error_file_id=None, request_counts=SimpleNamespace(completed=1, failed=0, total=1))
+
+    def _file_content(self, file_id):
+        # Every submitted request gets an answer naming its batch
+        batch_id = file_id[len("output-"):]
+        input_file_id = dict(self.submitted).get(batch_id)
+        lines = [json.dumps({"custom_id": request["custom_id"], "response": {
+                    "status_code": 200,
+                    "body": {"choices": [{"message": {"content": f"{batch_id}: {request['custom_id']}"}}]}}})
+                 for request in self.requests.get(input_file_id, [])]
+        return SimpleNamespace(text="\n".join(lines))
+
+
+class MockClaudeClient:
+    """Stand-in for the Anthropic client's message batches API."""
+
+    def __init__(self):
+        self.submitted = []
+        self.retrieved = []
+        self.messages = SimpleNamespace(batches=SimpleNamespace(
+            create=self._create, retrieve=self._retrieve, results=self._results))
+
+    def _create(self, requests):
+        batch_id = f"msgbatch-{len(self.submitted)}"
+        self.submitted.append((batch_id, requests))
+        return SimpleNamespace(id=batch_id)
+
+    def _retrieve(self, batch_id):
+        self.retrieved.append(batch_id)
+        return SimpleNamespace(id=batch_id, processing_status="ended",
+                               request_counts=SimpleNamespace(processing=0))
+
+    def _results(self, batch_id):
+        requests = dict(self.submitted).get(batch_id, [])
+        return [SimpleNamespace(custom_id=request["custom_id"], result=SimpleNamespace(
+                    type="succeeded", message=SimpleNamespace(
+                        content=[SimpleNamespace(text=f"{batch_id}: {request['custom_id']}")])))
+                for request in requests]
+
+
+class MockRegistry:
+    """ProviderRegistry handing out one mock client."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def client(self, model):
+        return self._client
+
+
+def requests_for(names, samples=2):
+    return [(custom_id(name, sample_id), f"Write {name}") for name in names for sample_id in range(samples)]
+
+
+def test_custom_ids_are_valid_and_unique():
+    names = ["prog", "prog 1", "prog_1", "prog/1", "prog:1", "programme-é", "",
+             "x" * 100, "x" * 100 + "y", "x" * 59, "x" * 60, "x" * 61]
+    names += [task.program_name for task in TaskStore.for_mode("Instruct")]
+    ids = [custom_id(name, sample_id) for name in names for sample_id in (0, 9, 10, 123)]
+    assert len(set(ids)) == len(ids)
+    for value in ids:
+        assert len(value) <= MAX_CUSTOM_ID
+        assert CUSTOM_ID.match(value), value
+
+
+def test_custom_ids_are_stable_and_readable():
+    assert custom_id("task_func_01", 3) == "task_func_01-3"
+    assert custom_id("prog 1", 0) == custom_id("prog 1", 0)
+    assert custom_id("prog 1", 0).startswith("prog_1-")
+
+
+@pytest.mark.parametrize("model, client_class", [("gpt-4o", MockGPTClient), ("claude-sonnet", MockClaudeClient)])
+def test_run_returns_responses_by_custom_id(tmp_path, model, client_class):
+    client = client_class()
+    requests = requests_for(["a", "b"])
+    results = BatchSubmitter(model, registry=MockRegistry(client)).run(requests, str(tmp_path / "batch.jsonl"))
+    batch_id = client.submitted[0][0]
+    assert results == {key: f"{batch_id}: {key}" for key, _ in requests}
+    assert len(client.submitted) == 1
+    # The batch is consumed, so a later run submits its own
+    assert not (tmp_path / "batch.state.json").exists()
+
+
+@pytest.mark.parametrize("model, client_class", [("gpt-4o", MockGPTClient), ("claude-sonnet", MockClaudeClient)])
+def test_interrupted_run_attaches_to_its_batch(tmp_path, model, client_class):
+    client = client_class()
+    submitter = BatchSubmitter(model, registry=MockRegistry(client))
+    requests = requests_for(["a", "b"])
+    path = str(tmp_path / "batch.jsonl")
+
+    # Interrupted while polling: the batch is submitted and its state file written
+    submitter.write_batch_file(requests, path)
+    batch_id = submitter.submit(path)
+    with open(tmp_path / "batch.state.json", "w") as f:
+        json.dump({"model": model, "batch_id": batch_id, "fingerprint": submitter.fingerprint(requests)}, f)
+
+    results = submitter.run(requests, path)
+    assert len(client.submitted) == 1
+    assert client.retrieved == [batch_id]
+    assert results == {key: f"{batch_id}: {key}" for key, _ in requests}
+
+
+@pytest.mark.parametrize("change", ["prompt", "settings", "model"])
+def test_other_requests_submit_a_new_batch(tmp_path, change):
+    client = MockGPTClient()
+    submitter = BatchSubmitter("gpt-4o", registry=MockRegistry(client))
+    requests = requests_for(["a", "b"])
+    path = str(tmp_path / "batch.jsonl")
+    submitter.write_batch_file(requests, path)
+    earlier = submitter.submit(path)
+    state = {"model": "gpt-4o", "batch_id": earlier, "fingerprint": submitter.fingerprint(requests)}
+    with open(tmp_path / "batch.state.json", "w") as f:
+        json.dump(state, f)
+
+    if change == "prompt":
+        requests = requests[:-1] + [(requests[-1][0], "Write something else")]
+    elif change == "settings":
+        submitter = BatchSubmitter("gpt-4o", temperature=0.0, registry=MockRegistry(client))
+    else:
+        submitter = BatchSubmitter("gpt-35-turbo", registry=MockRegistry(client))
+    results = submitter.run(requests, path)
+    assert len(client.submitted) == 2
+    batch_id = client.submitted[1][0]
+    assert client.retrieved == [batch_id]
+    assert results == {key: f"{batch_id}: {key}" for key, _ in requests}